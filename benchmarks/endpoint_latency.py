@@ -0,0 +1,329 @@
+"""Latency, throughput and SQL statements per request for every API endpoint.
+
+Runs against the database the app is configured for, which should already
+hold a generated dataset (see 'python seed.py --users ...'). Requests go
+through the Flask test client in-process, or to a running server with
+--base-url (e.g. a local gunicorn), in which case SQL counts are not
+available. Each endpoint is driven by --concurrency threads, each acting as
+a different seeded user, and the results are written as JSON for diffing.
+
+    python benchmarks/endpoint_latency.py --requests 200 --concurrency 8 --output latency.json
+    python benchmarks/endpoint_latency.py --base-url http://127.0.0.1:8000 --only /workouts /progress
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, func
+from app import app
+from models import db, User, Workout
+from catalog import catalog
+
+# ``prepare`` runs untimed before each request and returns values for ``path``/``body``
+Scenario = namedtuple("Scenario", ["name", "method", "path", "body", "prepare"])
+
+_counter = itertools.count()
+
+
+def _unique():
+    return f"{os.getpid()}{next(_counter)}"
+
+
+def _workout_body(rng):
+    template = rng.choice(list(catalog.templates.values()))
+    return {
+        "workout_name": "Benchmark workout",
+        "date": (datetime.now(timezone.utc) - timedelta(days=rng.randint(0, 30))).isoformat(),
+        "workout_type_id": template.workout_type_id,
+        "duration": rng.randint(20, 90),
+        "intensity": rng.randint(3, 9),
+        "exercises": [
+            {"exercise_template_id": template.id, "sets": 3, "reps": rng.randint(3, 12), "weight": rng.randint(20, 120)}
+            for _ in range(4)
+        ],
+    }
+
+
+def _create_workout(session, rng):
+    response = session.request("POST", "/workouts", _workout_body(rng))
+    return {"workout_id": response[2]["id"]}
+
+
+def _create_pb(session, rng):
+    response = session.request("POST", "/personal-bests", {"exercise_name": f"Benchmark {_unique()}", "max_weight": 50})
+    return {"pb_id": response[2]["id"]}
+
+
+def _throwaway_user(session, rng):
+    name = f"bench{_unique()}"
+    response = session.request(
+        "POST", "/register", {"username": name, "email": f"{name}@example.com", "password": "benchmark"}
+    )
+    return {"token": response[2]["access_token"]}
+
+
+def _import_body(rng):
+    return "\n".join(json.dumps(_workout_body(rng)) for _ in range(10))
+
+
+SCENARIOS = [
+    Scenario("GET /", "GET", "/", None, None),
+    Scenario("POST /register", "POST", "/register",
+             lambda rng, ctx: {"username": f"bench{_unique()}", "email": f"bench{_unique()}@example.com",
+                               "password": "benchmark"}, None),
+    Scenario("POST /login", "POST", "/login",
+             lambda rng, ctx: {"username": ctx["login_username"], "password": "benchmark"}, None),
+    Scenario("GET /users", "GET", "/users?limit=50", None, None),
+    Scenario("GET /profile", "GET", "/profile", None, None),
+    Scenario("PATCH /profile", "PATCH", "/profile",
+             lambda rng, ctx: {"timezone": rng.choice(["UTC", "Europe/London", "America/New_York"])}, None),
+    Scenario("DELETE /profile", "DELETE", "/profile", None, _throwaway_user),
+    Scenario("GET /workout_types", "GET", "/workout_types", None, None),
+    Scenario("GET /workout_types/<id>/exercises", "GET", "/workout_types/{workout_type_id}/exercises", None,
+             lambda session, rng: {"workout_type_id": rng.choice(list(catalog.workout_types))}),
+    Scenario("GET /workouts", "GET", "/workouts", None, None),
+    Scenario("POST /workouts", "POST", "/workouts", lambda rng, ctx: _workout_body(rng), None),
+    Scenario("POST /workouts/bulk", "POST", "/workouts/bulk",
+             lambda rng, ctx: {"workouts": [_workout_body(rng) for _ in range(20)]}, None),
+    Scenario("GET /workouts/export", "GET", "/workouts/export", None, None),
+    Scenario("POST /workouts/import", "POST", "/workouts/import?format=ndjson",
+             lambda rng, ctx: _import_body(rng), None),
+    Scenario("GET /workouts/<id>", "GET", "/workouts/{workout_id}", None,
+             lambda session, rng: {"workout_id": rng.choice(session.workout_ids)} if session.workout_ids
+             else _create_workout(session, rng)),
+    Scenario("PATCH /workouts/<id>", "PATCH", "/workouts/{workout_id}",
+             lambda rng, ctx: {"notes": "edited", "duration": rng.randint(20, 90)}, _create_workout),
+    Scenario("DELETE /workouts/<id>", "DELETE", "/workouts/{workout_id}", None, _create_workout),
+    Scenario("GET /progress", "GET", "/progress", None, None),
+    Scenario("GET /analytics/timeseries", "GET", "/analytics/timeseries?bucket=month", None, None),
+    Scenario("GET /analytics/exercises/<id>/progression", "GET", "/analytics/exercises/{template_id}/progression",
+             None, lambda session, rng: {"template_id": session.template_id}),
+    Scenario("GET /derived-data/status", "GET", "/derived-data/status", None, None),
+    Scenario("GET /leaderboards/streaks", "GET", "/leaderboards/streaks", None, None),
+    Scenario("GET /leaderboards/personal-bests/<exercise>", "GET", "/leaderboards/personal-bests/Squats", None, None),
+    Scenario("GET /personal-bests", "GET", "/personal-bests", None, None),
+    Scenario("POST /personal-bests", "POST", "/personal-bests",
+             lambda rng, ctx: {"exercise_name": f"Benchmark {_unique()}", "max_weight": 60}, None),
+    Scenario("PATCH /personal-bests/<id>", "PATCH", "/personal-bests/{pb_id}",
+             lambda rng, ctx: {"max_weight": rng.randint(60, 200)}, _create_pb),
+    Scenario("DELETE /personal-bests/<id>", "DELETE", "/personal-bests/{pb_id}", None, _create_pb),
+]
+
+
+class SqlCounter:
+    """Counts statements per thread while ``active`` is set on that thread."""
+
+    def __init__(self, engine):
+        self.local = threading.local()
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        if getattr(self.local, "active", False):
+            self.local.count += 1
+
+    def start(self):
+        self.local.active = True
+        self.local.count = 0
+
+    def stop(self):
+        self.local.active = False
+        return self.local.count
+
+
+class Session:
+    """One simulated user; talks to the test client or to --base-url."""
+
+    def __init__(self, base_url, user_id, workout_ids):
+        self.base_url = base_url
+        self.workout_ids = workout_ids
+        with app.app_context():
+            self.token = create_access_token(identity=user_id)
+        self.client = None if base_url else app.test_client()
+
+    def request(self, method, path, body=None, token=None):
+        headers = {"Authorization": f"Bearer {token or self.token}"}
+        if isinstance(body, str):
+            data, headers["Content-Type"] = body.encode(), "application/x-ndjson"
+        elif body is not None:
+            data, headers["Content-Type"] = json.dumps(body).encode(), "application/json"
+        else:
+            data = None
+
+        if self.client is not None:
+            response = self.client.open(path, method=method, data=data, headers=headers)
+            payload = response.get_data()
+            status = response.status_code
+        else:
+            req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+            try:
+                with urllib.request.urlopen(req) as response:
+                    status, payload = response.status, response.read()
+            except urllib.error.HTTPError as e:
+                status, payload = e.code, e.read()
+        try:
+            parsed = json.loads(payload) if payload else None
+        except ValueError:
+            parsed = None
+        return status, payload, parsed
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    position = (len(values) - 1) * p / 100
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def run_scenario(scenario, sessions, requests, counter, seed):
+    latencies, statements, statuses = [], [], {}
+    lock = threading.Lock()
+    remaining = itertools.count()
+
+    def worker(index):
+        session = sessions[index]
+        rng = random.Random(seed + index)
+        ctx = {"login_username": session.login_username}
+        while next(remaining) < requests:
+            values = scenario.prepare(session, rng) if scenario.prepare else {}
+            token = values.pop("token", None)
+            path = scenario.path.format(**values)
+            body = scenario.body(rng, ctx) if scenario.body else None
+
+            if counter:
+                counter.start()
+            started = time.perf_counter()
+            status, _, _ = session.request(scenario.method, path, body, token=token)
+            elapsed = time.perf_counter() - started
+            count = counter.stop() if counter else None
+
+            with lock:
+                latencies.append(elapsed)
+                if count is not None:
+                    statements.append(count)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(sessions)) as pool:
+        list(pool.map(worker, range(len(sessions))))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "endpoint": scenario.name,
+        "requests": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+        "throughput_rps": round(len(latencies) / wall, 2),
+        "sql_per_request": round(sum(statements) / len(statements), 2) if statements else None,
+        "sql_max": max(statements) if statements else None,
+        "statuses": {str(code): n for code, n in sorted(statuses.items())},
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def make_sessions(args):
+    rng = random.Random(args.seed)
+    with app.app_context():
+        catalog.ensure_fresh(force=True)
+        # Resolved here: the scenarios run on worker threads without an app context
+        squats = catalog.find_template("Squats")
+        template_id = squats.id if squats else min(catalog.templates, default=None)
+        # The most active users, so reads have realistic histories behind them
+        user_ids = [
+            user_id for (user_id,) in db.session.query(Workout.user_id)
+            .group_by(Workout.user_id).order_by(func.count(Workout.id).desc()).limit(args.concurrency * 4)
+        ] or [user_id for (user_id,) in db.session.query(User.id).limit(args.concurrency)]
+        if not user_ids:
+            sys.exit("No users found; seed the database first (python seed.py --users 100)")
+        picked = rng.sample(user_ids, min(len(user_ids), args.concurrency))
+        while len(picked) < args.concurrency:
+            picked.append(rng.choice(user_ids))
+        workout_ids = {
+            user_id: [w for (w,) in db.session.query(Workout.id).filter_by(user_id=user_id).limit(200)]
+            for user_id in set(picked)
+        }
+
+    sessions = []
+    for user_id in picked:
+        session = Session(args.base_url, user_id, workout_ids[user_id])
+        # A user with a known password for the login benchmark
+        login = f"bench{_unique()}"
+        session.request("POST", "/register", {"username": login, "email": f"{login}@example.com", "password": "benchmark"})
+        session.login_username = login
+        session.template_id = template_id
+        sessions.append(session)
+    return sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--base-url", help="Benchmark a running server instead of the in-process test client")
+    parser.add_argument("--only", nargs="*", help="Endpoint names or paths to run, e.g. '/workouts' 'GET /progress'")
+    parser.add_argument("--output", default="endpoint_latency.json")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if args.base_url:
+        args.base_url = args.base_url.rstrip("/")
+
+    scenarios = SCENARIOS
+    if args.only:
+        scenarios = [s for s in SCENARIOS if s.name in args.only or s.name.split(" ", 1)[1] in args.only]
+
+    sessions = make_sessions(args)
+    counter = None if args.base_url else SqlCounter(_engine())
+    results = []
+    for scenario in scenarios:
+        result = run_scenario(scenario, sessions, args.requests, counter, args.seed)
+        results.append(result)
+        sql = f"{result['sql_per_request']:>6}" if result["sql_per_request"] is not None else "     -"
+        print(f"{result['endpoint']:<36} p50 {result['p50_ms']:>8.2f}ms  p95 {result['p95_ms']:>8.2f}ms  "
+              f"p99 {result['p99_ms']:>8.2f}ms  {result['throughput_rps']:>8.1f} req/s  sql {sql}  "
+              f"{result['statuses']}")
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "target": args.base_url or "test-client",
+        "concurrency": args.concurrency,
+        "requests_per_endpoint": args.requests,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+
+def _engine():
+    with app.app_context():
+        return db.engine
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Password-check throughput of the login path, per core.
+
+Login cost is dominated by bcrypt, so this drives PasswordHasher.check (the
+exact call Login.post makes) from many client threads, standing in for the
+request threads of a threaded worker, and reports checks per second for each
+concurrency cap. The per-core figure divides by the CPU time the process
+actually used, so it stays honest whether the cap or the machine is the
+limit; cores_busy is that CPU time over the wall time.
+
+    python benchmarks/login_throughput.py --rounds 12 --seconds 5
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from flask_bcrypt import Bcrypt
+from password_hashing import PasswordHasher, HashingBusy
+
+
+def measure(max_concurrent, rounds, seconds, clients):
+    hasher = PasswordHasher(Bcrypt(), rounds=rounds, max_concurrent=max_concurrent, max_pending=clients)
+    pw_hash = hasher.hash("correct horse battery staple")
+    deadline = time.perf_counter() + seconds
+    done = rejected = 0
+    lock = threading.Lock()
+
+    def client():
+        nonlocal done, rejected
+        while time.perf_counter() < deadline:
+            try:
+                hasher.check(pw_hash, "correct horse battery staple")
+                with lock:
+                    done += 1
+            except HashingBusy:
+                with lock:
+                    rejected += 1
+
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        for _ in range(clients):
+            pool.submit(client)
+    elapsed = time.perf_counter() - start
+    cpu_seconds = time.process_time() - cpu_start
+    return {
+        "max_concurrent": max_concurrent,
+        "logins_per_sec": round(done / elapsed, 2),
+        "cores_busy": round(cpu_seconds / elapsed, 2),
+        "logins_per_sec_per_core": round(done / cpu_seconds, 2),
+        "rejected": rejected,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=int(os.environ.get("BCRYPT_LOG_ROUNDS", 12)))
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent login attempts")
+    parser.add_argument("--max-concurrent", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    results = []
+    max_concurrent = 1
+    while max_concurrent <= args.max_concurrent:
+        result = measure(max_concurrent, args.rounds, args.seconds, args.clients)
+        results.append(result)
+        print(
+            f"concurrent={result['max_concurrent']:>3}  {result['logins_per_sec']:>8.1f} logins/s  "
+            f"{result['logins_per_sec_per_core']:>7.1f} /s/core  cores={result['cores_busy']:>5.2f}  rejected={result['rejected']}"
+        )
+        max_concurrent *= 2
+    print(json.dumps({"rounds": args.rounds, "cpu_count": os.cpu_count(), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""ORM to_dict versus the Core-row serializers, for the read endpoints' payloads.
+
+Seeds an in-memory SQLite database (or --database-url), then times building
+the same response with both paths and checks the JSON is identical.
+
+    python benchmarks/serialization.py --workouts 2000 --exercises 4 --repeat 5
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from flask import Flask
+from sqlalchemy import insert
+from models import db, User, Workout, WorkoutType, WorkoutExercise, ExerciseTemplate, PersonalBest
+from serializers import (workout_select, workout_dicts, personal_best_select, personal_best_dict,
+                         user_select, user_dict, personal_best_dicts)
+
+
+def seed(workouts, exercises):
+    db.session.add(WorkoutType(id=1, name="Strength"))
+    db.session.add_all([
+        ExerciseTemplate(id=i, name=f"Exercise {i}", type="strength", workout_type_id=1) for i in range(1, 11)
+    ])
+    db.session.add(User(id=1, username="bench", email="bench@example.com", password_hash="x"))
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    db.session.execute(insert(Workout.__table__), [
+        {"id": i, "user_id": 1, "workout_type_id": 1, "workout_name": f"Workout {i}", "notes": "notes",
+         "intensity": 5.0, "duration": 45, "estimated_calories": 300.0, "date": start + timedelta(hours=i)}
+        for i in range(1, workouts + 1)
+    ])
+    db.session.execute(insert(WorkoutExercise.__table__), [
+        {"workout_id": w, "exercise_template_id": e % 10 + 1, "sets": 3, "reps": 8, "weight": 60.0 + e}
+        for w in range(1, workouts + 1) for e in range(exercises)
+    ])
+    db.session.execute(insert(PersonalBest.__table__), [
+        {"user_id": 1, "exercise_name": f"Exercise {i}", "max_weight": 100.0, "max_reps": 10, "date_achieved": start}
+        for i in range(1, 11)
+    ])
+    db.session.commit()
+
+
+def orm_payloads():
+    workouts = Workout.query_with_details().filter(Workout.user_id == 1).order_by(Workout.date, Workout.id).all()
+    personal_bests = PersonalBest.query.filter_by(user_id=1).order_by(PersonalBest.id).all()
+    user = db.session.get(User, 1)
+    return [w.to_dict() for w in workouts], [pb.to_dict() for pb in personal_bests], user.to_dict()
+
+
+def core_payloads():
+    rows = db.session.execute(workout_select().where(Workout.user_id == 1).order_by(Workout.date, Workout.id)).all()
+    pb_rows = db.session.execute(personal_best_select().where(PersonalBest.user_id == 1).order_by(PersonalBest.id))
+    user = db.session.execute(user_select().where(User.id == 1)).first()
+    return (
+        workout_dicts(rows),
+        [personal_best_dict(row) for row in pb_rows],
+        user_dict(user, personal_bests=personal_best_dicts([1])[1]),
+    )
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        payload = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, payload
+
+
+def canonical(payload):
+    # PersonalBest.to_dict comes from SerializerMixin, whose key order is set order
+    workouts, personal_bests, user = payload
+    return json.dumps(workouts), json.dumps([personal_bests, user], sort_keys=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--workouts", type=int, default=2000)
+    parser.add_argument("--exercises", type=int, default=4, help="Exercises per workout")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = args.database_url
+    db.init_app(app)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed(args.workouts, args.exercises)
+
+        orm_seconds, orm_payload = timed(orm_payloads, args.repeat)
+        core_seconds, core_payload = timed(core_payloads, args.repeat)
+        if canonical(orm_payload) != canonical(core_payload):
+            sys.exit("Serializers disagree with to_dict")
+
+    result = {
+        "workouts": args.workouts,
+        "exercises_per_workout": args.exercises,
+        "orm_ms": round(orm_seconds * 1000, 2),
+        "core_ms": round(core_seconds * 1000, 2),
+        "speedup": round(orm_seconds / core_seconds, 2),
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Recompute stored calorie estimates with the MET formula in chunks.
+
+Each chunk reads a keyset page of workouts with their exercises, evaluates
+calories.estimate_calories for all of them at once with NumPy, and writes
+the results back with one bulk UPDATE per table. The same transaction
+adjusts user_stats and weekly_training by the change in calories, bumps
+the affected users' data versions and advances a BackfillCheckpoint. An
+interrupted run therefore resumes after the last committed chunk.
+"""
+import time
+import numpy as np
+from sqlalchemy import bindparam, select, text, update
+from catalog import catalog
+from calories import DEFAULT_BODY_WEIGHT_KG, DEFAULT_MET, SECONDS_PER_REP, template_met
+from models import db, User, Workout, WorkoutExercise, UserStats, WeeklyTraining, BackfillCheckpoint, utc_now
+from training_rollup import sql_week_and_month
+
+BACKFILL_NAME = "met_calories"
+BACKFILL_CHUNK_SIZE = 5000
+
+
+def _floats(values):
+    # None becomes NaN so missing values survive the conversion
+    return np.array(values, dtype=float)
+
+
+def _met_lookup():
+    catalog.ensure_fresh(force=True)
+    lookup = np.full(max(catalog.templates, default=0) + 1, DEFAULT_MET)
+    for template_id, template in catalog.templates.items():
+        lookup[template_id] = template_met(template)
+    return lookup
+
+
+def compute_chunk(workouts, exercises, met_lookup):
+    """Vectorized estimate_calories for a chunk.
+
+    ``workouts`` columns: id (ascending), duration, body weight.
+    ``exercises`` columns: workout id, template id, sets, reps, duration.
+    Returns (workout calories, exercise calories) as arrays in input order.
+    """
+    workout_ids = workouts[0].astype(np.int64)
+    weight = np.where(np.isnan(workouts[2]), DEFAULT_BODY_WEIGHT_KG, workouts[2])
+    duration = np.nan_to_num(workouts[1])
+
+    index = np.searchsorted(workout_ids, exercises[0].astype(np.int64))
+    template_ids = exercises[1].astype(np.int64)
+    met = np.where(template_ids < len(met_lookup), met_lookup[np.minimum(template_ids, len(met_lookup) - 1)],
+                   DEFAULT_MET)
+    sets, reps, exercise_duration = exercises[2], exercises[3], exercises[4]
+    rep_minutes = np.where(np.isnan(sets) | (sets == 0), 1, sets) * np.nan_to_num(reps) * SECONDS_PER_REP / 60
+    minutes = np.where(np.isnan(exercise_duration), rep_minutes, exercise_duration)
+    exercise_calories = np.round(met * weight[index] * minutes / 60, 2)
+
+    n = len(workout_ids)
+    covered = np.bincount(index, minutes, minlength=n)
+    count = np.bincount(index, minlength=n)
+    mean_met = np.where(count > 0, np.bincount(index, met, minlength=n) / np.maximum(count, 1), DEFAULT_MET)
+    leftover = np.maximum(duration - covered, 0)
+    workout_calories = np.round(
+        np.bincount(index, exercise_calories, minlength=n) + mean_met * weight * leftover / 60, 2
+    )
+    return workout_calories, exercise_calories
+
+
+def _bulk_update(table, ids, values):
+    if not len(ids):
+        return
+    if db.engine.dialect.name == "postgresql":
+        # One statement for the whole chunk, joined against the arrays
+        db.session.execute(
+            text(
+                f"UPDATE {table.name} AS t SET estimated_calories = v.calories "
+                "FROM unnest(CAST(:ids AS integer[]), CAST(:calories AS double precision[])) AS v(id, calories) "
+                "WHERE t.id = v.id"
+            ),
+            {"ids": ids.tolist(), "calories": values.tolist()},
+        )
+        return
+    db.session.execute(
+        update(table).where(table.c.id == bindparam("b_id")).values(estimated_calories=bindparam("b_calories")),
+        [{"b_id": i, "b_calories": v} for i, v in zip(ids.tolist(), values.tolist())],
+    )
+
+
+def _apply_deltas(user_ids, weeks, months, type_ids, deltas):
+    changed = deltas != 0
+    if not changed.any():
+        return []
+    user_ids, deltas = user_ids[changed], deltas[changed]
+    weeks, months, type_ids = weeks[changed], months[changed], type_ids[changed]
+
+    users, inverse = np.unique(user_ids, return_inverse=True)
+    per_user = np.bincount(inverse, deltas)
+    stats = UserStats.__table__
+    db.session.execute(
+        update(stats).where(stats.c.user_id == bindparam("b_user_id"))
+        .values(total_calories=stats.c.total_calories + bindparam("b_delta")),
+        [{"b_user_id": u, "b_delta": d} for u, d in zip(users.tolist(), per_user.tolist())],
+    )
+
+    # Undated workouts are not in the weekly rollup
+    dated = np.array([week is not None for week in weeks], dtype=bool)
+    if dated.any():
+        keys = list(zip(user_ids[dated].tolist(), weeks[dated], months[dated], type_ids[dated].tolist()))
+        groups = {}
+        for key, delta in zip(keys, deltas[dated].tolist()):
+            groups[key] = groups.get(key, 0) + delta
+        weekly = WeeklyTraining.__table__
+        db.session.execute(
+            update(weekly)
+            .where(
+                weekly.c.user_id == bindparam("b_user_id"),
+                weekly.c.week_start == bindparam("b_week"),
+                weekly.c.month_start == bindparam("b_month"),
+                weekly.c.workout_type_id == bindparam("b_type_id"),
+            )
+            .values(calories=weekly.c.calories + bindparam("b_delta")),
+            [
+                {"b_user_id": u, "b_week": w, "b_month": m, "b_type_id": t, "b_delta": d}
+                for (u, w, m, t), d in groups.items()
+            ],
+        )
+    return users.tolist()
+
+
+def backfill_calories(chunk_size=BACKFILL_CHUNK_SIZE, restart=False, report=print):
+    """Recompute every workout's and exercise's estimated_calories; returns the number of workouts done."""
+    checkpoint = db.session.get(BackfillCheckpoint, BACKFILL_NAME)
+    if checkpoint is None:
+        checkpoint = BackfillCheckpoint(name=BACKFILL_NAME, last_id=0, rows_done=0)
+        db.session.add(checkpoint)
+    if restart:
+        checkpoint.last_id = 0
+        checkpoint.rows_done = 0
+    db.session.commit()
+    if checkpoint.last_id:
+        report(f"Resuming after workout {checkpoint.last_id} ({checkpoint.rows_done} already done).")
+
+    met_lookup = _met_lookup()
+    week_start, month_start = sql_week_and_month()
+    started = time.perf_counter()
+    done = 0
+    while True:
+        rows = db.session.execute(
+            select(
+                Workout.id, Workout.duration, User.body_weight_kg, Workout.estimated_calories,
+                Workout.user_id, Workout.workout_type_id, week_start, month_start,
+            )
+            .outerjoin(User, Workout.user_id == User.id)
+            .where(Workout.id > checkpoint.last_id)
+            .order_by(Workout.id)
+            .limit(chunk_size)
+            .with_for_update(of=Workout)
+        ).all()
+        if not rows:
+            break
+        ids, durations, weights, old, user_ids, type_ids, weeks, months = zip(*rows)
+
+        exercise_rows = db.session.execute(
+            select(
+                WorkoutExercise.id, WorkoutExercise.workout_id, WorkoutExercise.exercise_template_id,
+                WorkoutExercise.sets, WorkoutExercise.reps, WorkoutExercise.duration,
+            )
+            .where(WorkoutExercise.workout_id.between(ids[0], ids[-1]))
+        ).all()
+        exercise_columns = list(zip(*exercise_rows)) or [()] * 6
+
+        workout_ids = np.array(ids, dtype=np.int64)
+        workout_calories, exercise_calories = compute_chunk(
+            [workout_ids, _floats(durations), _floats(weights)],
+            [_floats(column) for column in exercise_columns[1:]],
+            met_lookup,
+        )
+        _bulk_update(Workout.__table__, workout_ids, workout_calories)
+        _bulk_update(WorkoutExercise.__table__, np.array(exercise_columns[0], dtype=np.int64), exercise_calories)
+
+        deltas = np.round(workout_calories - np.nan_to_num(_floats(old)), 2)
+        changed_users = _apply_deltas(
+            np.array(user_ids, dtype=np.int64), np.array(weeks, dtype=object), np.array(months, dtype=object),
+            np.array(type_ids, dtype=np.int64), deltas,
+        )
+        if changed_users:
+            db.session.execute(
+                update(User).where(User.id.in_(changed_users))
+                .values(data_version=User.data_version + 1, data_modified_at=utc_now())
+            )
+
+        checkpoint.last_id = ids[-1]
+        checkpoint.rows_done += len(ids)
+        db.session.commit()
+
+        done += len(ids)
+        elapsed = time.perf_counter() - started
+        report(f"{checkpoint.rows_done} workouts, {len(exercise_rows)} exercises in the last chunk, "
+               f"{done / elapsed:.0f} workouts/s, last id {checkpoint.last_id}")
+
+    elapsed = time.perf_counter() - started
+    report(f"Backfilled {done} workouts in {elapsed:.1f}s ({done / elapsed if elapsed else 0:.0f} workouts/s).")
+    return done
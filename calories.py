@@ -0,0 +1,68 @@
+"""MET-based calorie estimates.
+
+An exercise burns MET x body weight (kg) x hours over the minutes it took:
+its logged duration, or for set/rep exercises the time under tension.
+Workout time not covered by its exercises (rests, transitions) is charged
+at the mean MET of those exercises, so a long strength session still
+counts. calorie_backfill.py applies the same formula to stored history
+with NumPy.
+"""
+from models import db, User
+
+DEFAULT_BODY_WEIGHT_KG = 70.0
+# Used when an exercise template has no MET of its own
+DEFAULT_MET = 4.0
+TYPE_METS = {"strength": 5.0, "cardio": 8.0, "mobility": 2.5}
+SECONDS_PER_REP = 4
+
+
+def template_met(template):
+    if template is None:
+        return DEFAULT_MET
+    return template.met or TYPE_METS.get(template.type, DEFAULT_MET)
+
+
+def exercise_minutes(sets, reps, duration):
+    if duration is not None:
+        return duration
+    if reps:
+        return (sets or 1) * reps * SECONDS_PER_REP / 60
+    return 0
+
+
+def estimate_calories(duration, exercises, body_weight_kg=None):
+    """Calories for a workout of ``duration`` minutes.
+
+    ``exercises`` are (met, sets, reps, duration) tuples. Returns the
+    workout total and the estimate for each exercise, in order.
+    """
+    weight = body_weight_kg or DEFAULT_BODY_WEIGHT_KG
+    per_exercise = []
+    covered = 0
+    met_total = 0
+    for met, sets, reps, exercise_duration in exercises:
+        minutes = exercise_minutes(sets, reps, exercise_duration)
+        covered += minutes
+        met_total += met
+        per_exercise.append(round(met * weight * minutes / 60, 2))
+
+    mean_met = met_total / len(per_exercise) if per_exercise else DEFAULT_MET
+    leftover = max((duration or 0) - covered, 0)
+    total = round(sum(per_exercise) + mean_met * weight * leftover / 60, 2)
+    return total, per_exercise
+
+
+def apply_calorie_estimates(workout, exercises, body_weight_kg=None):
+    """Set estimated_calories on ``workout`` and on each of its (template, WorkoutExercise) pairs."""
+    total, per_exercise = estimate_calories(
+        workout.duration,
+        [(template_met(template), we.sets, we.reps, we.duration) for template, we in exercises],
+        body_weight_kg,
+    )
+    for (_, we), calories in zip(exercises, per_exercise):
+        we.estimated_calories = calories
+    workout.estimated_calories = total
+
+
+def body_weight(user_id):
+    return db.session.query(User.body_weight_kg).filter(User.id == user_id).scalar()
@@ -0,0 +1,132 @@
+import threading
+import time
+import uuid
+from collections import namedtuple
+from flask import current_app
+from models import db, WorkoutType, ExerciseTemplate, CatalogVersion
+
+CachedWorkoutType = namedtuple("CachedWorkoutType", ["id", "name"])
+CachedTemplate = namedtuple("CachedTemplate", ["id", "name", "type", "supports_distance", "workout_type_id", "met"])
+
+
+def _as_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class CatalogCache:
+    """Per-process copy of the workout type / exercise template catalog.
+
+    Every worker keeps its own copy and compares it against the shared
+    catalog_version row at most once per CATALOG_CHECK_SECONDS, so all
+    workers converge after invalidate() without a query per request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        self.workout_types = {}
+        self.templates = {}
+        self._type_dicts = []
+        self._template_dicts_by_type = {}
+        self._type_ids_by_name = {}
+        self._template_ids_by_name = {}
+
+    @property
+    def etag(self):
+        self.ensure_fresh()
+        return f"catalog-{self._version}"
+
+    def _stored_version(self):
+        row = db.session.get(CatalogVersion, CatalogVersion.SINGLETON_ID)
+        return row.version if row else "initial"
+
+    def ensure_fresh(self, force=False):
+        interval = current_app.config.get("CATALOG_CHECK_SECONDS", 5)
+        with self._lock:
+            if not force and self._version is not None and time.monotonic() - self._checked_at < interval:
+                return
+            version = self._stored_version()
+            if version != self._version:
+                self._load(version)
+            self._checked_at = time.monotonic()
+
+    def _load(self, version):
+        workout_types = WorkoutType.query.order_by(WorkoutType.id).all()
+        templates = ExerciseTemplate.query.order_by(ExerciseTemplate.id).all()
+
+        self.workout_types = {wt.id: CachedWorkoutType(wt.id, wt.name) for wt in workout_types}
+        self.templates = {
+            et.id: CachedTemplate(et.id, et.name, et.type, et.supports_distance, et.workout_type_id, et.met)
+            for et in templates
+        }
+        self._type_dicts = [wt.to_dict() for wt in workout_types]
+        self._template_dicts_by_type = {wt.id: [] for wt in workout_types}
+        for et in templates:
+            self._template_dicts_by_type.setdefault(et.workout_type_id, []).append(et.to_dict())
+        self._type_ids_by_name = {wt.name.lower(): wt.id for wt in workout_types}
+        self._template_ids_by_name = {}
+        for et in templates:
+            self._template_ids_by_name.setdefault((et.workout_type_id, et.name.lower()), et.id)
+            self._template_ids_by_name.setdefault((None, et.name.lower()), et.id)
+        self._version = version
+
+    def get_workout_type(self, workout_type_id):
+        key = _as_id(workout_type_id)
+        self.ensure_fresh()
+        if key not in self.workout_types:
+            # Could have been added since the last version check
+            self.ensure_fresh(force=True)
+        return self.workout_types.get(key)
+
+    def get_template(self, template_id):
+        key = _as_id(template_id)
+        self.ensure_fresh()
+        if key not in self.templates:
+            self.ensure_fresh(force=True)
+        return self.templates.get(key)
+
+    def find_workout_type(self, name):
+        key = str(name).strip().lower()
+        self.ensure_fresh()
+        if key not in self._type_ids_by_name:
+            self.ensure_fresh(force=True)
+        return self.workout_types.get(self._type_ids_by_name.get(key))
+
+    def find_template(self, name, workout_type_id=None):
+        """Case-insensitive name lookup, preferring a template of ``workout_type_id``."""
+        name = str(name).strip().lower()
+        self.ensure_fresh()
+        for _ in range(2):
+            template_id = self._template_ids_by_name.get((_as_id(workout_type_id), name))
+            if template_id is None:
+                template_id = self._template_ids_by_name.get((None, name))
+            if template_id is not None:
+                return self.templates.get(template_id)
+            self.ensure_fresh(force=True)
+        return None
+
+    def workout_type_dicts(self):
+        self.ensure_fresh()
+        return self._type_dicts
+
+    def template_dicts(self, workout_type_id):
+        if self.get_workout_type(workout_type_id) is None:
+            return None
+        return self._template_dicts_by_type.get(_as_id(workout_type_id), [])
+
+    def invalidate(self):
+        """Bump the shared version so every worker reloads; the caller commits."""
+        row = db.session.get(CatalogVersion, CatalogVersion.SINGLETON_ID)
+        if row is None:
+            row = CatalogVersion(id=CatalogVersion.SINGLETON_ID)
+            db.session.add(row)
+        row.version = uuid.uuid4().hex
+        with self._lock:
+            self._version = None
+
+
+catalog = CatalogCache()
@@ -0,0 +1,163 @@
+"""Engine configuration from the environment and read-replica routing.
+
+DATABASE_URL points at the primary. When DATABASE_REPLICA_URL is set it is
+registered as the "replica" bind, and GET handlers wrapped in
+@read_replica send their SELECTs there. A client that has just written
+stays on the primary for REPLICA_STICKY_SECONDS so it always reads its own
+writes: the worker that took the write remembers the user, and a cookie
+carries the deadline to the other workers.
+
+GET requests never write, so on PostgreSQL their transactions are opened
+READ ONLY and a stray write fails instead of taking row locks.
+
+SQLite connections get foreign keys turned on: ON DELETE CASCADE, which
+the passive_deletes relationships rely on, is ignored otherwise.
+"""
+import functools
+import sqlite3
+import threading
+import time
+from flask import g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+REPLICA_BIND = "replica"
+STICKY_COOKIE = "fittrack_primary_until"
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+READ_METHODS = {"GET", "HEAD"}
+
+
+def _env_bool(environ, name, default):
+    value = environ.get(name)
+    return default if value is None else value.lower() in ("1", "true", "yes")
+
+
+def _env_int(environ, name, default):
+    value = environ.get(name)
+    return int(value) if value else default
+
+
+def normalize_url(url):
+    # Heroku/Render style URLs use a scheme SQLAlchemy no longer accepts
+    if url.startswith("postgres://"):
+        return "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+def engine_options(url, environ):
+    """SQLAlchemy create_engine() options for ``url`` from DB_* environment variables."""
+    options = {
+        "pool_pre_ping": _env_bool(environ, "DB_POOL_PRE_PING", True),
+        "pool_recycle": _env_int(environ, "DB_POOL_RECYCLE", 1800),
+    }
+    if url.startswith("sqlite"):
+        return options
+    # Per gunicorn worker: each worker holds up to pool_size + max_overflow connections
+    options["pool_size"] = _env_int(environ, "DB_POOL_SIZE", 5)
+    options["max_overflow"] = _env_int(environ, "DB_MAX_OVERFLOW", 10)
+    options["pool_timeout"] = _env_int(environ, "DB_POOL_TIMEOUT", 30)
+    statement_timeout = _env_int(environ, "DB_STATEMENT_TIMEOUT_MS", 30000)
+    if statement_timeout and url.startswith("postgresql"):
+        options["connect_args"] = {"options": f"-c statement_timeout={statement_timeout}"}
+    return options
+
+
+def configure_database(app, environ):
+    url = normalize_url(environ.get("DATABASE_URL", "sqlite:///fittrack.db"))
+    app.config["SQLALCHEMY_DATABASE_URI"] = url
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(url, environ)
+    app.config["REPLICA_STICKY_SECONDS"] = _env_int(environ, "REPLICA_STICKY_SECONDS", 10)
+    replica_url = environ.get("DATABASE_REPLICA_URL")
+    if replica_url:
+        replica_url = normalize_url(replica_url)
+        app.config["SQLALCHEMY_BINDS"] = {
+            REPLICA_BIND: {"url": replica_url, **engine_options(replica_url, environ)},
+        }
+
+
+@event.listens_for(Engine, "connect")
+def _sqlite_foreign_keys(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+class RoutingSession(Session):
+    """Sends reads to the replica inside @read_replica handlers; flushes always go to the primary."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_request_context() and g.get("read_replica"):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_begin")
+def _read_only_transaction(session, transaction, connection):
+    if has_request_context() and request.method in READ_METHODS and connection.dialect.name == "postgresql":
+        connection.exec_driver_sql("SET TRANSACTION READ ONLY")
+
+
+class ReadYourWrites:
+    """Remembers which users wrote recently so their reads stay on the primary."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._recent_writers = {}
+
+    def init_app(self, app):
+        self.app = app
+        app.after_request(self._after_request)
+
+    def sticky(self, user_id):
+        now = time.time()
+        try:
+            if float(request.cookies.get(STICKY_COOKIE, 0)) > now:
+                return True
+        except ValueError:
+            pass
+        with self._lock:
+            return self._recent_writers.get(user_id, 0) > now
+
+    def _after_request(self, response):
+        if request.method not in WRITE_METHODS or response.status_code >= 400:
+            return response
+        if REPLICA_BIND not in self.app.config.get("SQLALCHEMY_BINDS", {}):
+            return response
+        seconds = self.app.config["REPLICA_STICKY_SECONDS"]
+        until = time.time() + seconds
+        try:
+            user_id = get_jwt_identity()
+        except RuntimeError:
+            user_id = None
+        if user_id is not None:
+            with self._lock:
+                now = time.time()
+                self._recent_writers = {
+                    writer: deadline for writer, deadline in self._recent_writers.items() if deadline > now
+                }
+                self._recent_writers[user_id] = until
+        response.set_cookie(STICKY_COOKIE, f"{until:.3f}", max_age=seconds, httponly=True, samesite="Lax")
+        return response
+
+
+read_your_writes = ReadYourWrites()
+
+
+def read_replica(fn):
+    """Route the handler's queries to the replica unless the caller wrote within the sticky window.
+
+    Apply under @jwt_required() so the caller's identity is known.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        g.read_replica = not read_your_writes.sticky(get_jwt_identity())
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            g.read_replica = False
+    return wrapper
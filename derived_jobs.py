@@ -0,0 +1,288 @@
+import time
+import traceback
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from sqlalchemy import and_, exists, func, or_
+from sqlalchemy.orm import aliased
+from models import db, User, DerivedJob, UserStats, utc_now
+from personal_bests import PBEntry, apply_personal_bests
+from streaks import update_user_streaks
+from user_stats import NO_TOTALS, WorkoutTotals, apply_user_stats
+from training_rollup import TrainingEntry, apply_training
+from leaderboards import update_leaderboards
+
+JOB_MAX_ATTEMPTS = 5
+# Requests applying their own jobs try each once; retries are left to the worker
+INLINE_JOB_ATTEMPTS = 1
+# A running job whose worker has not finished it by then is claimed again
+JOB_LEASE = timedelta(minutes=5)
+JOB_RETENTION = timedelta(days=1)
+
+QueuedChanges = namedtuple(
+    "QueuedChanges", ["totals", "dates_added", "dates_removed", "training_added", "training_removed"]
+)
+
+
+def _entry_to_json(entry):
+    return [entry.exercise_name, entry.date.isoformat() if entry.date else None, *entry[2:]]
+
+
+def _entry_from_json(values):
+    name, date, *metrics = values
+    return PBEntry(name, datetime.fromisoformat(date) if date else None, *metrics)
+
+
+def _training_to_json(entry):
+    return [entry.week_start.isoformat(), entry.month_start.isoformat(), *entry[2:]]
+
+
+def _training_from_json(values):
+    week_start, month_start, *rest = values
+    return TrainingEntry(date.fromisoformat(week_start), date.fromisoformat(month_start), *rest)
+
+
+def enqueue_derived_update(user_id, pb_added=(), pb_removed=(), dates_added=(), dates_removed=(),
+                           totals_added=NO_TOTALS, totals_removed=NO_TOTALS,
+                           training_added=(), training_removed=()):
+    """Record a write's effect on PBs, streaks and stats for the worker.
+
+    Runs inside the caller's transaction, so the job commits atomically with
+    the workout change. Deltas are merged into the user's newest job while
+    it is still pending, so a burst of writes costs a single worker pass.
+    An older pending job (one being retried) is never merged into, since
+    its deltas must apply before anything queued after it.
+    """
+    job = (
+        DerivedJob.query
+        .filter_by(user_id=user_id)
+        .order_by(DerivedJob.id.desc())
+        .with_for_update()
+        .first()
+    )
+    if job is None or job.status != 'pending':
+        job = DerivedJob(user_id=user_id, status='pending', payload={})
+        db.session.add(job)
+
+    payload = dict(job.payload or {})
+    payload['pb_added'] = payload.get('pb_added', []) + [_entry_to_json(e) for e in pb_added]
+    payload['pb_removed'] = payload.get('pb_removed', []) + [_entry_to_json(e) for e in pb_removed]
+    payload['dates_added'] = payload.get('dates_added', []) + [d.isoformat() for d in dates_added if d]
+    payload['dates_removed'] = payload.get('dates_removed', []) + [d.isoformat() for d in dates_removed if d]
+    totals = payload.get('totals_delta', list(NO_TOTALS))
+    payload['totals_delta'] = [t + a - r for t, a, r in zip(totals, totals_added, totals_removed)]
+    payload['training_added'] = payload.get('training_added', []) + [_training_to_json(e) for e in training_added]
+    payload['training_removed'] = payload.get('training_removed', []) + [_training_to_json(e) for e in training_removed]
+
+    # Reassign so the JSON column is marked dirty
+    job.payload = payload
+    job.updated_at = utc_now()
+    return job
+
+
+def queued_changes(user_id, after_id=0):
+    """The deltas of the user's unfinished jobs after ``after_id``, folded together.
+
+    Rebuilds read the workout tables, which already hold these writes, and
+    leave the deltas out so applying the jobs later doesn't count them twice.
+    """
+    # Waits out a worker that is applying one of them
+    User.query.filter_by(id=user_id).with_for_update().first()
+    jobs = DerivedJob.query.filter(
+        DerivedJob.user_id == user_id, DerivedJob.id > after_id, DerivedJob.status != 'done'
+    )
+    totals = list(NO_TOTALS)
+    changes = QueuedChanges(NO_TOTALS, [], [], [], [])
+    for job in jobs:
+        payload = job.payload or {}
+        totals = [t + d for t, d in zip(totals, payload.get('totals_delta', NO_TOTALS))]
+        changes.dates_added.extend(datetime.fromisoformat(d) for d in payload.get('dates_added', []))
+        changes.dates_removed.extend(datetime.fromisoformat(d) for d in payload.get('dates_removed', []))
+        changes.training_added.extend(_training_from_json(e) for e in payload.get('training_added', []))
+        changes.training_removed.extend(_training_from_json(e) for e in payload.get('training_removed', []))
+    return changes._replace(totals=WorkoutTotals(*totals))
+
+
+def queued_totals(user_id, after_id=0):
+    """Sum of the stats deltas in the user's unfinished jobs after ``after_id``."""
+    return queued_changes(user_id, after_id).totals
+
+
+def _still_claimed(job, attempt):
+    db.session.refresh(job, with_for_update=True)
+    return job.status == 'running' and job.attempts == attempt
+
+
+def _apply_job(job, attempt):
+    """Apply ``job``'s deltas; False when its lease passed to another worker first."""
+    # Serialises work on one user across workers
+    user = User.query.filter_by(id=job.user_id).with_for_update().first()
+    # Checked under the user lock, so a reclaimed job is never applied twice
+    if not _still_claimed(job, attempt):
+        return False
+    if user is None:
+        return True
+
+    payload = job.payload or {}
+    pb_added = [_entry_from_json(e) for e in payload.get('pb_added', [])]
+    pb_removed = [_entry_from_json(e) for e in payload.get('pb_removed', [])]
+    apply_personal_bests(user.id, added=pb_added, removed=pb_removed)
+    # A missing stats row is rebuilt from the tables, which already include the later jobs' writes
+    queued = queued_totals(user.id, after_id=job.id) if db.session.get(UserStats, user.id) is None else NO_TOTALS
+    apply_user_stats(user.id, added=WorkoutTotals(*payload.get('totals_delta', NO_TOTALS)), queued=queued)
+    apply_training(
+        user.id,
+        added=[_training_from_json(e) for e in payload.get('training_added', [])],
+        removed=[_training_from_json(e) for e in payload.get('training_removed', [])],
+    )
+    update_user_streaks(
+        user,
+        added=[datetime.fromisoformat(d) for d in payload.get('dates_added', [])],
+        removed=[datetime.fromisoformat(d) for d in payload.get('dates_removed', [])],
+    )
+    update_leaderboards(user.id, {e.exercise_name for e in pb_added + pb_removed})
+    User.bump_data_version(user.id)
+    return True
+
+
+def claim_next_job(user_id=None, max_attempts=None):
+    """Lease the oldest pending job, or a running one whose worker let its lease lapse.
+
+    Deltas depend on order, so a job is only claimable once every earlier
+    job for its user is done: a pending retry or a failed job holds back
+    the rest of that user's queue. Jobs already tried ``max_attempts``
+    times are skipped.
+    """
+    now = utc_now()
+    earlier = aliased(DerivedJob)
+    query = DerivedJob.query.filter(
+        or_(
+            DerivedJob.status == 'pending',
+            and_(DerivedJob.status == 'running', DerivedJob.claimed_at < now - JOB_LEASE),
+        ),
+        ~exists().where(
+            earlier.user_id == DerivedJob.user_id, earlier.id < DerivedJob.id, earlier.status != 'done'
+        ),
+    )
+    if user_id is not None:
+        query = query.filter_by(user_id=user_id)
+    if max_attempts is not None:
+        query = query.filter(func.coalesce(DerivedJob.attempts, 0) < max_attempts)
+    while True:
+        job = query.order_by(DerivedJob.id).with_for_update(skip_locked=True).first()
+        if job is None:
+            db.session.rollback()
+            return None
+        job.updated_at = now
+        # A job that keeps killing its worker never gets to record an error
+        if job.status == 'running' and job.attempts >= JOB_MAX_ATTEMPTS:
+            job.status = 'failed'
+            job.error = f"Lease expired {job.attempts} times without the job finishing."
+            db.session.commit()
+            _report_blocked(job)
+            continue
+        job.status = 'running'
+        job.attempts = (job.attempts or 0) + 1
+        job.claimed_at = now
+        db.session.commit()
+        return job
+
+
+def run_job(job):
+    attempt = job.attempts
+    try:
+        if not _apply_job(job, attempt):
+            db.session.rollback()
+            return False
+        job.status = 'done'
+        job.error = None
+        job.updated_at = utc_now()
+        db.session.commit()
+        return True
+    except Exception:
+        db.session.rollback()
+        job = db.session.get(DerivedJob, job.id)
+        if job.status != 'running' or job.attempts != attempt:
+            # Reclaimed after the lease ran out; the new holder reports on it
+            db.session.rollback()
+            return False
+        job.status = 'failed' if job.attempts >= JOB_MAX_ATTEMPTS else 'pending'
+        job.error = traceback.format_exc()[-2000:]
+        job.updated_at = utc_now()
+        db.session.commit()
+        print(f"[DERIVED JOB ERROR] job {job.id} user {job.user_id}:", job.error)
+        if job.status == 'failed':
+            _report_blocked(job)
+        return False
+
+
+def _report_blocked(job):
+    print(
+        f"[DERIVED JOB FAILED] job {job.id}: user {job.user_id}'s derived data is blocked until "
+        f"'flask requeue-failed-jobs --user {job.user_id}'"
+    )
+
+
+def drain_jobs(user_id=None, max_attempts=None):
+    """Process pending jobs until none are left; returns how many ran.
+
+    Used by 'flask worker --drain', by requests in inline mode and by tests
+    that need derived data settled before asserting on it.
+    """
+    processed = 0
+    while True:
+        job = claim_next_job(user_id, max_attempts)
+        if job is None:
+            return processed
+        run_job(job)
+        processed += 1
+
+
+def requeue_failed_jobs(user_id=None):
+    """Send failed jobs back to pending with fresh attempts; returns how many."""
+    query = DerivedJob.query.filter_by(status='failed')
+    if user_id is not None:
+        query = query.filter_by(user_id=user_id)
+    count = query.update({"status": 'pending', "attempts": 0, "updated_at": utc_now()})
+    db.session.commit()
+    return count
+
+
+def blocked_users():
+    """Users whose queue is held back by a failed job, mapped to how many of their jobs wait on it."""
+    failed = (
+        db.session.query(DerivedJob.user_id, func.min(DerivedJob.id).label("job_id"))
+        .filter(DerivedJob.status == 'failed')
+        .group_by(DerivedJob.user_id)
+        .subquery()
+    )
+    rows = (
+        db.session.query(failed.c.user_id, func.count(DerivedJob.id))
+        .outerjoin(DerivedJob, and_(
+            DerivedJob.user_id == failed.c.user_id, DerivedJob.id > failed.c.job_id, DerivedJob.status != 'done'
+        ))
+        .group_by(failed.c.user_id)
+        .order_by(failed.c.user_id)
+    )
+    return dict(rows.all())
+
+
+def prune_jobs():
+    DerivedJob.query.filter(
+        DerivedJob.status == 'done', DerivedJob.updated_at < utc_now() - JOB_RETENTION
+    ).delete()
+    db.session.commit()
+
+
+def run_worker(poll_interval=1.0):
+    while True:
+        if not drain_jobs():
+            prune_jobs()
+            time.sleep(poll_interval)
+
+
+def job_status(user_id=None):
+    query = db.session.query(DerivedJob.status, func.count(DerivedJob.id))
+    if user_id is not None:
+        query = query.filter(DerivedJob.user_id == user_id)
+    counts = dict(query.group_by(DerivedJob.status).all())
+    return {status: counts.get(status, 0) for status in ('pending', 'running', 'done', 'failed')}
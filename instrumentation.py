@@ -0,0 +1,194 @@
+"""Per-request query count, DB time, serialization time and handler time.
+
+SQLAlchemy engine events and Flask request hooks fill a RequestMetrics on
+``g``. Each response carries them as a Server-Timing header, and
+process-wide histograms are rendered in the Prometheus text format for
+/metrics. Metrics are per process, so with several gunicorn workers each
+scrape sees the worker that answered it.
+"""
+import functools
+import threading
+import time
+from bisect import bisect_left
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        # DB time spent inside serialization, e.g. loading exercises for a page of workouts
+        self.serialize_db_seconds = 0.0
+        self.serializing = False
+
+
+def current_metrics():
+    if has_request_context():
+        return g.get("request_metrics")
+    return None
+
+
+def timed_serialization(fn):
+    """Count ``fn``'s run time as serialization; nested calls are only counted once."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        metrics = current_metrics()
+        if metrics is None or metrics.serializing:
+            return fn(*args, **kwargs)
+        metrics.serializing = True
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            metrics.serialize_seconds += time.perf_counter() - started
+            metrics.serializing = False
+    return wrapper
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.label_names = label_names
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total) in sorted(self._series.items()):
+                base = _format_labels(self.label_names, labels)
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{self.name}_bucket{{{base},le="{le}"}} {cumulative}')
+                lines.append(f"{self.name}_sum{{{base}}} {total}")
+                lines.append(f"{self.name}_count{{{base}}} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{{{_format_labels(self.label_names, labels)}}} {value}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+class Instrumentation:
+    def __init__(self, app=None):
+        labels = ("endpoint", "method")
+        self.request_seconds = Histogram(
+            "fittrack_request_duration_seconds", "Time spent handling the request.", LATENCY_BUCKETS, labels)
+        self.db_seconds = Histogram(
+            "fittrack_request_db_seconds", "Time spent in SQL per request.", LATENCY_BUCKETS, labels)
+        self.serialize_seconds = Histogram(
+            "fittrack_request_serialize_seconds", "Time spent building and encoding response bodies per request.",
+            LATENCY_BUCKETS, labels)
+        self.queries = Histogram(
+            "fittrack_request_queries", "SQL statements per request.", QUERY_BUCKETS, labels)
+        self.requests = Counter(
+            "fittrack_requests_total", "Requests handled.", ("endpoint", "method", "status"))
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("SERVER_TIMING", True)
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        self.app = app
+
+    def _before_request(self):
+        g.request_metrics = RequestMetrics()
+
+    def _after_request(self, response):
+        metrics = g.pop("request_metrics", None)
+        if metrics is None:
+            return response
+        elapsed = time.perf_counter() - metrics.started
+        serialize = max(metrics.serialize_seconds - metrics.serialize_db_seconds, 0.0)
+
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        labels = (endpoint, request.method)
+        self.request_seconds.observe(labels, elapsed)
+        self.db_seconds.observe(labels, metrics.db_seconds)
+        self.serialize_seconds.observe(labels, serialize)
+        self.queries.observe(labels, metrics.query_count)
+        self.requests.inc(labels + (response.status_code,))
+
+        if self.app.config["SERVER_TIMING"]:
+            response.headers["Server-Timing"] = ", ".join([
+                f'db;dur={metrics.db_seconds * 1000:.2f};desc="{metrics.query_count} queries"',
+                f"serialize;dur={serialize * 1000:.2f}",
+                f"app;dur={elapsed * 1000:.2f}",
+            ])
+        return response
+
+    def render(self):
+        lines = []
+        for metric in (self.request_seconds, self.db_seconds, self.serialize_seconds, self.queries, self.requests):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_metrics() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _handle_error(exception_context):
+    started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics = current_metrics()
+    started = conn.info.get("query_started")
+    if metrics is None or not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    metrics.query_count += 1
+    metrics.db_seconds += elapsed
+    if metrics.serializing:
+        metrics.serialize_db_seconds += elapsed
@@ -0,0 +1,284 @@
+"""Ranked leaderboards for longest streaks and per-exercise personal bests.
+
+Every board keeps one LeaderboardEntry per ranked user, one
+LeaderboardScore per distinct score holding how many users have it, and
+LeaderboardBucket user counts per score range. Scores are stored rounded to
+SCORE_DECIMALS, so each has an integer key (the score in hundredths), and
+level L groups keys by key // 10**L for L = 1..BUCKET_LEVELS. Top-K is a
+range scan of the (board, score) index. A user's rank is one plus the users
+above them: the higher scores in their own level-1 bucket, the at most nine
+higher sibling buckets under the same parent at each level, and the top
+level buckets above theirs (each spans 10,000 points, so there are only a
+few). A lookup therefore reads O(BUCKET_LEVELS) rows however many users or
+distinct scores the board has. All three tables are kept current by the PB
+and streak write paths; 'flask rebuild-leaderboards' recreates them from
+users and personal_bests.
+"""
+from sqlalchemy import and_, delete, func, insert, literal, or_, select, update
+from catalog import catalog
+from models import db, User, PersonalBest, LeaderboardEntry, LeaderboardScore, LeaderboardBucket
+
+STREAK_BOARD = "streaks"
+LEADERBOARD_SIZE = 10
+LEADERBOARD_SIZE_MAX = 100
+REBUILD_BATCH = 5000
+SCORE_DECIMALS = 2
+BUCKET_LEVELS = 6
+
+
+def pb_board(exercise_name):
+    return f"pb:{exercise_name}"
+
+
+def pb_metric(exercise_name):
+    """The PersonalBest column an exercise is ranked by."""
+    template = catalog.find_template(exercise_name)
+    if template is None or template.type == "strength":
+        return "max_weight"
+    if template.supports_distance:
+        return "max_distance"
+    if template.type == "cardio":
+        return "max_reps"
+    return "max_duration"
+
+
+def _score_value(board, score):
+    # Scores are stored as floats; streaks are whole days
+    return int(score) if board == STREAK_BOARD and score is not None else score
+
+
+def _score_key(score):
+    return round(score * 10 ** SCORE_DECIMALS)
+
+
+def _count_changes(changes, board, score, delta):
+    # Level 0 is the exact score's LeaderboardScore row
+    changes[(board, 0, score)] = changes.get((board, 0, score), 0) + delta
+    key = _score_key(score)
+    for level in range(1, BUCKET_LEVELS + 1):
+        bucket = (board, level, key // 10 ** level)
+        changes[bucket] = changes.get(bucket, 0) + delta
+
+
+def _change_count(model, keys, delta):
+    where = [getattr(model, column) == value for column, value in keys.items()]
+    updated = db.session.execute(update(model).where(*where).values(user_count=model.user_count + delta))
+    if updated.rowcount == 0 and delta > 0:
+        db.session.execute(insert(model).values(**keys, user_count=delta))
+    elif delta < 0:
+        db.session.execute(delete(model).where(*where, model.user_count <= 0))
+
+
+def _apply_count_changes(changes):
+    # Sorted so concurrent updates touch count rows in the same order; moves within a bucket cancel out
+    for (board, level, value), delta in sorted(changes.items()):
+        if delta == 0:
+            continue
+        if level == 0:
+            _change_count(LeaderboardScore, {"board": board, "score": value}, delta)
+        else:
+            _change_count(LeaderboardBucket, {"board": board, "level": level, "bucket": value}, delta)
+
+
+def _set_scores(user_id, scores):
+    """Move ``user_id`` to the given {board: score} positions; a None score leaves the board."""
+    if not scores:
+        return
+    current = dict(
+        db.session.execute(
+            select(LeaderboardEntry.board, LeaderboardEntry.score)
+            .where(LeaderboardEntry.user_id == user_id, LeaderboardEntry.board.in_(list(scores)))
+        ).all()
+    )
+    changes = {}
+    for board in sorted(scores):
+        old, new = current.get(board), scores[board]
+        if old == new:
+            continue
+        if old is not None:
+            _count_changes(changes, board, old, -1)
+        if new is None:
+            db.session.execute(
+                delete(LeaderboardEntry)
+                .where(LeaderboardEntry.board == board, LeaderboardEntry.user_id == user_id)
+            )
+            continue
+        _count_changes(changes, board, new, 1)
+        if old is None:
+            db.session.execute(insert(LeaderboardEntry).values(board=board, user_id=user_id, score=new))
+        else:
+            db.session.execute(
+                update(LeaderboardEntry)
+                .where(LeaderboardEntry.board == board, LeaderboardEntry.user_id == user_id)
+                .values(score=new)
+            )
+    _apply_count_changes(changes)
+
+
+def _best_by_exercise(user_filter, names=None):
+    query = (
+        select(
+            PersonalBest.user_id,
+            PersonalBest.exercise_name,
+            func.max(PersonalBest.max_weight),
+            func.max(PersonalBest.max_reps),
+            func.max(PersonalBest.max_duration),
+            func.max(PersonalBest.max_distance),
+        )
+        .where(user_filter)
+        .group_by(PersonalBest.user_id, PersonalBest.exercise_name)
+    )
+    if names is not None:
+        query = query.where(PersonalBest.exercise_name.in_(list(names)))
+    return query
+
+
+def _pb_score(exercise_name, values, metrics):
+    if exercise_name not in metrics:
+        metrics[exercise_name] = pb_metric(exercise_name)
+    weight, reps, duration, distance = values
+    score = {"max_weight": weight, "max_reps": reps, "max_duration": duration, "max_distance": distance}[
+        metrics[exercise_name]
+    ]
+    return round(score, SCORE_DECIMALS) if score else None
+
+
+def update_leaderboards(user_id, exercise_names=(), streak=True):
+    """Re-rank ``user_id`` on the streak board and the boards of ``exercise_names``.
+
+    Call after the user's longest_streak or PersonalBest rows for those
+    exercises changed, in the same transaction.
+    """
+    scores = {}
+    if streak:
+        db.session.flush()
+        longest = db.session.execute(select(User.longest_streak).where(User.id == user_id)).scalar()
+        scores[STREAK_BOARD] = longest or None
+
+    names = set(exercise_names)
+    if names:
+        db.session.flush()
+        scores.update(dict.fromkeys(pb_board(name) for name in names))
+        metrics = {}
+        for _, name, *values in db.session.execute(_best_by_exercise(PersonalBest.user_id == user_id, names)):
+            scores[pb_board(name)] = _pb_score(name, values, metrics)
+    _set_scores(user_id, scores)
+
+
+def remove_user(user_id):
+    """Take ``user_id`` off every board, e.g. before the account is deleted."""
+    boards = db.session.execute(
+        select(LeaderboardEntry.board).where(LeaderboardEntry.user_id == user_id)
+    ).scalars().all()
+    _set_scores(user_id, dict.fromkeys(boards))
+
+
+def rebuild_leaderboards():
+    """Recreate every board from users.longest_streak and personal_bests; the caller commits."""
+    db.session.execute(delete(LeaderboardBucket))
+    db.session.execute(delete(LeaderboardScore))
+    db.session.execute(delete(LeaderboardEntry))
+
+    db.session.execute(
+        insert(LeaderboardEntry).from_select(
+            ["board", "user_id", "score"],
+            select(literal(STREAK_BOARD), User.id, User.longest_streak).where(User.longest_streak > 0),
+        )
+    )
+
+    metrics = {}
+    batch = []
+    for user_id, name, *values in db.session.execute(
+        _best_by_exercise(PersonalBest.user_id.in_(select(User.id))).execution_options(yield_per=REBUILD_BATCH)
+    ):
+        score = _pb_score(name, values, metrics)
+        if score is not None:
+            batch.append({"board": pb_board(name), "user_id": user_id, "score": score})
+        if len(batch) >= REBUILD_BATCH:
+            db.session.execute(insert(LeaderboardEntry), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(LeaderboardEntry), batch)
+
+    db.session.execute(
+        insert(LeaderboardScore).from_select(
+            ["board", "score", "user_count"],
+            select(LeaderboardEntry.board, LeaderboardEntry.score, func.count())
+            .group_by(LeaderboardEntry.board, LeaderboardEntry.score),
+        )
+    )
+
+    # Bucket keys are computed here rather than in SQL, whose rounding differs between databases
+    buckets = {}
+    for board, score, user_count in db.session.execute(
+        select(LeaderboardScore.board, LeaderboardScore.score, LeaderboardScore.user_count)
+        .execution_options(yield_per=REBUILD_BATCH)
+    ):
+        _count_changes(buckets, board, score, user_count)
+    rows = [
+        {"board": board, "level": level, "bucket": bucket, "user_count": user_count}
+        for (board, level, bucket), user_count in buckets.items() if level > 0
+    ]
+    for start in range(0, len(rows), REBUILD_BATCH):
+        db.session.execute(insert(LeaderboardBucket), rows[start:start + REBUILD_BATCH])
+
+
+def user_rank(board, user_id):
+    """(rank, score) of ``user_id`` on ``board``, or (None, None) when not ranked. Ties share a rank."""
+    score = db.session.execute(
+        select(LeaderboardEntry.score)
+        .where(LeaderboardEntry.board == board, LeaderboardEntry.user_id == user_id)
+    ).scalar()
+    if score is None:
+        return None, None
+    key = _score_key(score)
+    finest = key // 10
+    # Higher scores sharing the user's level-1 bucket; stored scores sit on whole keys, hence the half-key bound
+    exact = (
+        select(func.coalesce(func.sum(LeaderboardScore.user_count), 0))
+        .where(
+            LeaderboardScore.board == board,
+            LeaderboardScore.score > score,
+            LeaderboardScore.score < (finest * 10 + 9.5) / 10 ** SCORE_DECIMALS,
+        )
+    )
+    ranges = []
+    for level in range(1, BUCKET_LEVELS):
+        bucket = key // 10 ** level
+        ranges.append(and_(
+            LeaderboardBucket.level == level,
+            LeaderboardBucket.bucket > bucket,
+            LeaderboardBucket.bucket <= bucket - bucket % 10 + 9,
+        ))
+    ranges.append(and_(
+        LeaderboardBucket.level == BUCKET_LEVELS, LeaderboardBucket.bucket > key // 10 ** BUCKET_LEVELS
+    ))
+    higher = (
+        select(func.coalesce(func.sum(LeaderboardBucket.user_count), 0))
+        .where(LeaderboardBucket.board == board, or_(*ranges))
+    )
+    ahead = db.session.execute(select(exact.scalar_subquery(), higher.scalar_subquery())).one()
+    return sum(ahead) + 1, _score_value(board, score)
+
+
+def top_entries(board, limit=LEADERBOARD_SIZE):
+    rows = db.session.execute(
+        select(LeaderboardEntry.user_id, User.username, LeaderboardEntry.score)
+        .join(User, User.id == LeaderboardEntry.user_id)
+        .where(LeaderboardEntry.board == board)
+        .order_by(LeaderboardEntry.score.desc(), LeaderboardEntry.user_id)
+        .limit(limit)
+    )
+    entries = []
+    for position, (user_id, username, score) in enumerate(rows, start=1):
+        rank = entries[-1]["rank"] if entries and entries[-1]["score"] == score else position
+        entries.append({"rank": rank, "user_id": user_id, "username": username, "score": _score_value(board, score)})
+    return entries
+
+
+def leaderboard(board, user_id, limit=LEADERBOARD_SIZE):
+    rank, score = user_rank(board, user_id)
+    return {
+        "entries": top_entries(board, limit),
+        "user": {"user_id": user_id, "rank": rank, "score": score},
+    }
@@ -0,0 +1,46 @@
+"""user stats rollup
+
+Revision ID: 02120e46be84
+Revises: 1eef30d9a6a8
+Create Date: 2026-10-16 11:26:51.904113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '02120e46be84'
+down_revision = '1eef30d9a6a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('total_workouts', sa.Integer(), nullable=False),
+    sa.Column('total_exercises', sa.Integer(), nullable=False),
+    sa.Column('total_calories', sa.Float(), nullable=False),
+    sa.Column('total_duration', sa.Integer(), nullable=False),
+    sa.Column('total_distance', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    op.execute(
+        """
+        INSERT INTO user_stats (user_id, total_workouts, total_exercises, total_calories, total_duration, total_distance)
+        SELECT u.id,
+               (SELECT COUNT(*) FROM workouts w WHERE w.user_id = u.id),
+               (SELECT COUNT(*) FROM workout_exercises we JOIN workouts w ON we.workout_id = w.id WHERE w.user_id = u.id),
+               (SELECT COALESCE(SUM(w.estimated_calories), 0) FROM workouts w WHERE w.user_id = u.id),
+               (SELECT COALESCE(SUM(w.duration), 0) FROM workouts w WHERE w.user_id = u.id),
+               (SELECT COALESCE(SUM(we.distance), 0) FROM workout_exercises we JOIN workouts w ON we.workout_id = w.id WHERE w.user_id = u.id)
+        FROM users u
+        """
+    )
+
+
+def downgrade():
+    op.drop_table('user_stats')
@@ -0,0 +1,62 @@
+"""weekly training rollup
+
+Revision ID: 12f42ec31e33
+Revises: c9ce6a9fa834
+Create Date: 2026-10-17 09:41:07.512380
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '12f42ec31e33'
+down_revision = 'c9ce6a9fa834'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('weekly_training',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('week_start', sa.Date(), nullable=False),
+    sa.Column('month_start', sa.Date(), nullable=False),
+    sa.Column('workout_type_id', sa.Integer(), nullable=False),
+    sa.Column('workout_count', sa.Integer(), nullable=False),
+    sa.Column('calories', sa.Float(), nullable=False),
+    sa.Column('duration', sa.Integer(), nullable=False),
+    sa.Column('volume', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['workout_type_id'], ['workout_types.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'week_start', 'month_start', 'workout_type_id')
+    )
+
+    # Backfill with the same UTC week/month buckets as training_rollup
+    if op.get_bind().dialect.name == 'postgresql':
+        week = "CAST(date_trunc('week', timezone('UTC', w.date)) AS DATE)"
+        month = "CAST(date_trunc('month', timezone('UTC', w.date)) AS DATE)"
+    else:
+        week = "date(w.date, 'weekday 0', '-6 days')"
+        month = "date(w.date, 'start of month')"
+    op.execute(
+        f"""
+        INSERT INTO weekly_training (user_id, week_start, month_start, workout_type_id, workout_count, calories, duration, volume)
+        SELECT w.user_id, {week}, {month}, w.workout_type_id,
+               COUNT(w.id),
+               COALESCE(SUM(w.estimated_calories), 0),
+               COALESCE(SUM(w.duration), 0),
+               COALESCE(SUM(v.volume), 0)
+        FROM workouts w
+        LEFT JOIN (
+            SELECT workout_id, SUM(COALESCE(sets, 1) * reps * weight) AS volume
+            FROM workout_exercises
+            GROUP BY workout_id
+        ) v ON v.workout_id = w.id
+        WHERE w.date IS NOT NULL
+        GROUP BY w.user_id, {week}, {month}, w.workout_type_id
+        """
+    )
+
+
+def downgrade():
+    op.drop_table('weekly_training')
@@ -0,0 +1,28 @@
+"""catalog version
+
+Revision ID: 16cb0ad1f009
+Revises: 02120e46be84
+Create Date: 2026-10-16 12:40:08.117364
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '16cb0ad1f009'
+down_revision = '02120e46be84'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('catalog_version',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.String(length=32), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('catalog_version')
@@ -0,0 +1,25 @@
+"""workouts keyset index
+
+Revision ID: 1eef30d9a6a8
+Revises: a658624792b1
+Create Date: 2026-10-16 10:03:17.582940
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '1eef30d9a6a8'
+down_revision = 'a658624792b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('workouts', schema=None) as batch_op:
+        batch_op.create_index('ix_workouts_user_id_date_id', ['user_id', 'date', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('workouts', schema=None) as batch_op:
+        batch_op.drop_index('ix_workouts_user_id_date_id')
@@ -0,0 +1,29 @@
+"""derived job leases
+
+Revision ID: 4d7e2b9a1c60
+Revises: e3a8f61b2c47
+Create Date: 2026-10-17 14:21:37.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d7e2b9a1c60'
+down_revision = 'e3a8f61b2c47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('derived_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('claimed_at', sa.DateTime(timezone=True), nullable=True))
+
+    # Jobs already running lease from their last update, so stuck ones get picked up again
+    op.execute("UPDATE derived_jobs SET claimed_at = updated_at WHERE status = 'running'")
+
+
+def downgrade():
+    with op.batch_alter_table('derived_jobs', schema=None) as batch_op:
+        batch_op.drop_column('claimed_at')
@@ -0,0 +1,34 @@
+"""index audit
+
+Revision ID: 5294cee9dd10
+Revises: 12f42ec31e33
+Create Date: 2026-10-17 10:22:39.160254
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5294cee9dd10'
+down_revision = '12f42ec31e33'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('workout_exercises', schema=None) as batch_op:
+        batch_op.create_index('ix_workout_exercises_workout_id_template_id', ['workout_id', 'exercise_template_id'], unique=False)
+
+    # The composite index also serves the lookups by user_id alone
+    with op.batch_alter_table('personal_bests', schema=None) as batch_op:
+        batch_op.create_index('ix_personal_bests_user_id_exercise_name', ['user_id', 'exercise_name'], unique=False)
+        batch_op.drop_index('ix_personal_bests_user_id')
+
+
+def downgrade():
+    with op.batch_alter_table('personal_bests', schema=None) as batch_op:
+        batch_op.create_index('ix_personal_bests_user_id', ['user_id'], unique=False)
+        batch_op.drop_index('ix_personal_bests_user_id_exercise_name')
+
+    with op.batch_alter_table('workout_exercises', schema=None) as batch_op:
+        batch_op.drop_index('ix_workout_exercises_workout_id_template_id')
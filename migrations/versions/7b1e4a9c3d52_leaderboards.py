@@ -0,0 +1,47 @@
+"""leaderboards
+
+Revision ID: 7b1e4a9c3d52
+Revises: 5294cee9dd10
+Create Date: 2026-10-17 11:05:48.331907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b1e4a9c3d52'
+down_revision = '5294cee9dd10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('leaderboard_entries',
+    sa.Column('board', sa.String(length=160), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('board', 'user_id')
+    )
+    with op.batch_alter_table('leaderboard_entries', schema=None) as batch_op:
+        batch_op.create_index('ix_leaderboard_entries_board_score', ['board', 'score'], unique=False)
+        batch_op.create_index(batch_op.f('ix_leaderboard_entries_user_id'), ['user_id'], unique=False)
+
+    op.create_table('leaderboard_scores',
+    sa.Column('board', sa.String(length=160), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('user_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('board', 'score')
+    )
+    # Boards are filled by 'flask rebuild-leaderboards', which needs the
+    # exercise catalog to pick each exercise's ranking metric
+
+
+def downgrade():
+    op.drop_table('leaderboard_scores')
+    with op.batch_alter_table('leaderboard_entries', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_leaderboard_entries_user_id'))
+        batch_op.drop_index('ix_leaderboard_entries_board_score')
+
+    op.drop_table('leaderboard_entries')
@@ -0,0 +1,32 @@
+"""leaderboard buckets
+
+Revision ID: 8c3f5a1d9e72
+Revises: 4d7e2b9a1c60
+Create Date: 2026-10-17 15:02:44.903716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c3f5a1d9e72'
+down_revision = '4d7e2b9a1c60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('leaderboard_buckets',
+    sa.Column('board', sa.String(length=160), nullable=False),
+    sa.Column('level', sa.Integer(), nullable=False),
+    sa.Column('bucket', sa.BigInteger(), nullable=False),
+    sa.Column('user_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('board', 'level', 'bucket')
+    )
+    # Filled, and existing scores rounded to leaderboards.SCORE_DECIMALS, by
+    # 'flask rebuild-leaderboards'; ranks are off until it has run
+
+
+def downgrade():
+    op.drop_table('leaderboard_buckets')
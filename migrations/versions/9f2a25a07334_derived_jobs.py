@@ -0,0 +1,42 @@
+"""derived jobs
+
+Revision ID: 9f2a25a07334
+Revises: 16cb0ad1f009
+Create Date: 2026-10-16 14:02:55.640218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9f2a25a07334'
+down_revision = '16cb0ad1f009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('derived_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('derived_jobs', schema=None) as batch_op:
+        batch_op.create_index('ix_derived_jobs_status_id', ['status', 'id'], unique=False)
+        batch_op.create_index('ix_derived_jobs_user_id_status', ['user_id', 'status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('derived_jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_derived_jobs_user_id_status')
+        batch_op.drop_index('ix_derived_jobs_status_id')
+
+    op.drop_table('derived_jobs')
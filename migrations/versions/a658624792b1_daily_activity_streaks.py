@@ -0,0 +1,93 @@
+"""daily activity streaks
+
+Revision ID: a658624792b1
+Revises: d86b86587977
+Create Date: 2026-10-16 09:12:44.301127
+
+"""
+from collections import Counter
+from datetime import timedelta, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a658624792b1'
+down_revision = 'd86b86587977'
+branch_labels = None
+depends_on = None
+
+BACKFILL_CHUNK_SIZE = 5000
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('timezone', sa.String(length=64), nullable=False, server_default='UTC'))
+
+    daily_activity = op.create_table('daily_activity',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('local_date', sa.Date(), nullable=False),
+    sa.Column('workout_count', sa.Integer(), nullable=False),
+    sa.Column('streak', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'local_date')
+    )
+
+    # Backfill from existing workouts. Every user starts out on UTC, so the
+    # local day is the UTC calendar day.
+    workouts = sa.table(
+        'workouts', sa.column('id', sa.Integer()), sa.column('user_id', sa.Integer()), sa.column('date', sa.DateTime())
+    )
+    users = sa.table('users', sa.column('id', sa.Integer()), sa.column('longest_streak', sa.Integer()))
+    bind = op.get_bind()
+
+    def flush_user(user_id, counts):
+        rows = []
+        prev_date = None
+        streak = longest = 0
+        for day in sorted(counts):
+            streak = streak + 1 if prev_date and day == prev_date + timedelta(days=1) else 1
+            longest = max(longest, streak)
+            rows.append({'user_id': user_id, 'local_date': day, 'workout_count': counts[day], 'streak': streak})
+            prev_date = day
+        if rows:
+            op.bulk_insert(daily_activity, rows)
+        bind.execute(users.update().where(users.c.id == user_id).values(longest_streak=longest))
+
+    # Keyset pages in (user_id, id) order, so memory stays bounded on large tables
+    current_user, counts = None, Counter()
+    last_user, last_id = 0, 0
+    while True:
+        rows = bind.execute(
+            sa.select(workouts.c.user_id, workouts.c.id, workouts.c.date)
+            .where(
+                workouts.c.date.isnot(None),
+                sa.or_(
+                    workouts.c.user_id > last_user,
+                    sa.and_(workouts.c.user_id == last_user, workouts.c.id > last_id),
+                ),
+            )
+            .order_by(workouts.c.user_id, workouts.c.id)
+            .limit(BACKFILL_CHUNK_SIZE)
+        ).all()
+        if not rows:
+            break
+        for user_id, _, date in rows:
+            if user_id != current_user:
+                if current_user is not None:
+                    flush_user(current_user, counts)
+                current_user, counts = user_id, Counter()
+            if date.tzinfo is not None:
+                date = date.astimezone(timezone.utc)
+            counts[date.date()] += 1
+        last_user, last_id = rows[-1][0], rows[-1][1]
+    if current_user is not None:
+        flush_user(current_user, counts)
+
+
+def downgrade():
+    op.drop_table('daily_activity')
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('timezone')
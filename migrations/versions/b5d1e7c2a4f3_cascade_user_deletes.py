@@ -0,0 +1,41 @@
+"""cascade user deletes
+
+Revision ID: b5d1e7c2a4f3
+Revises: 8c3f5a1d9e72
+Create Date: 2026-10-18 09:12:05.418227
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d1e7c2a4f3'
+down_revision = '8c3f5a1d9e72'
+branch_labels = None
+depends_on = None
+
+TABLES = ('workouts', 'personal_bests')
+# The initial migration left these foreign keys unnamed; batch mode on SQLite names them by this
+SQLITE_NAMING = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+
+def _replace_user_fk(table, ondelete):
+    foreign_key = next(
+        fk for fk in sa.inspect(op.get_bind()).get_foreign_keys(table)
+        if fk['constrained_columns'] == ['user_id']
+    )
+    old_name = foreign_key['name'] or f'fk_{table}_user_id_users'
+    with op.batch_alter_table(table, naming_convention=SQLITE_NAMING) as batch_op:
+        batch_op.drop_constraint(old_name, type_='foreignkey')
+        batch_op.create_foreign_key(f'{table}_user_id_fkey', 'users', ['user_id'], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    for table in TABLES:
+        _replace_user_fk(table, 'CASCADE')
+
+
+def downgrade():
+    for table in TABLES:
+        _replace_user_fk(table, None)
@@ -0,0 +1,28 @@
+"""user data version
+
+Revision ID: c9ce6a9fa834
+Revises: 9f2a25a07334
+Create Date: 2026-10-16 15:21:43.873052
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9ce6a9fa834'
+down_revision = '9f2a25a07334'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('data_version', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('data_modified_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('data_modified_at')
+        batch_op.drop_column('data_version')
@@ -0,0 +1,48 @@
+"""met calories
+
+Revision ID: e3a8f61b2c47
+Revises: 7b1e4a9c3d52
+Create Date: 2026-10-17 11:48:12.604519
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a8f61b2c47'
+down_revision = '7b1e4a9c3d52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('body_weight_kg', sa.Float(), nullable=True))
+
+    with op.batch_alter_table('exercise_templates', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('met', sa.Float(), nullable=True))
+
+    with op.batch_alter_table('workout_exercises', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('estimated_calories', sa.Float(), nullable=True))
+
+    op.create_table('backfill_checkpoints',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('last_id', sa.Integer(), nullable=False),
+    sa.Column('rows_done', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+    # Stored calories still use the old formula until 'flask backfill-calories' runs
+
+
+def downgrade():
+    op.drop_table('backfill_checkpoints')
+    with op.batch_alter_table('workout_exercises', schema=None) as batch_op:
+        batch_op.drop_column('estimated_calories')
+
+    with op.batch_alter_table('exercise_templates', schema=None) as batch_op:
+        batch_op.drop_column('met')
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('body_weight_kg')
@@ -1,12 +1,19 @@
 # models.py
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.orm import relationship, validates
-from sqlalchemy import MetaData, Date, cast
+from sqlalchemy.orm import relationship, validates, joinedload, selectinload
+from sqlalchemy import MetaData
 from datetime import datetime, timedelta, timezone
 from sqlalchemy_serializer import SerializerMixin
+from instrumentation import timed_serialization
+from database import RoutingSession
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:  # Python < 3.9
+    from backports.zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 metadata = MetaData()
-db = SQLAlchemy(metadata=metadata)
+db = SQLAlchemy(metadata=metadata, session_options={"class_": RoutingSession})
 
 def utc_now():
     return datetime.now(timezone.utc)
@@ -22,9 +29,19 @@ class User(db.Model, SerializerMixin):
     avatar = db.Column(db.String, nullable=True)
     date = db.Column(db.DateTime(timezone=True), default=utc_now)
     longest_streak = db.Column(db.Integer, default=0)
+    timezone = db.Column(db.String(64), nullable=False, default='UTC')
+    # Used for calorie estimates; unset means calories.DEFAULT_BODY_WEIGHT_KG
+    body_weight_kg = db.Column(db.Float, nullable=True)
+    # Bumped by every write that changes what this user's GETs return
+    data_version = db.Column(db.Integer, nullable=False, default=0)
+    data_modified_at = db.Column(db.DateTime(timezone=True), default=utc_now)
 
     workouts = relationship("Workout", back_populates="user", cascade='all, delete-orphan', passive_deletes=True)
-    personal_bests = relationship("PersonalBest", back_populates="user", cascade='all, delete-orphan', passive_deletes=True)
+    # Ordered so the (user_id, exercise_name) index doesn't decide the order
+    personal_bests = relationship("PersonalBest", back_populates="user", cascade='all, delete-orphan', passive_deletes=True,
+                                  order_by="PersonalBest.id")
+    daily_activity = relationship("DailyActivity", back_populates="user", cascade='all, delete-orphan', passive_deletes=True)
+    stats = relationship("UserStats", back_populates="user", uselist=False, cascade='all, delete-orphan', passive_deletes=True)
 
     def __repr__(self):
         return f"<User(id={self.id}, name={self.username}, email={self.email})>"
@@ -41,64 +58,56 @@ class User(db.Model, SerializerMixin):
             raise ValueError("Invalid email address")
         return value
 
-    def get_current_streak(self):
-        date_col = cast(Workout.date, Date)
-        workout_dates = (
-            db.session.query(date_col)
-            .filter_by(user_id=self.id)
-            .order_by(date_col)
-            .group_by(date_col)
-            .all()
-        )
-        
-        dates = {d[0] for d in workout_dates}
-        
-        streak = 0
-        today = datetime.now().date()
-        
-        current_date_check = None
-        if today in dates:
-            current_date_check = today
-        elif (today - timedelta(days=1)) in dates: 
-            current_date_check = today - timedelta(days=1)
-        
-        if current_date_check:
-            temp_date = current_date_check
-            while temp_date in dates:
-                streak += 1
-                temp_date -= timedelta(days=1) 
-        
-        if streak > self.longest_streak:
-            self.longest_streak = streak
-            
-        return streak
-    def get_longest_streak(self):
-        date_col = cast(Workout.date, Date)
-        workout_dates = (
-            db.session.query(date_col)
-            .filter_by(user_id=self.id)
-            .order_by(date_col)
-            .group_by(date_col)
-            .all()
+    @validates('timezone')
+    def validate_timezone(self, key, value):
+        try:
+            ZoneInfo(value)
+        except (ZoneInfoNotFoundError, ValueError, TypeError):
+            raise ValueError(f"Unknown timezone: {value}")
+        return value
+
+    @validates('body_weight_kg')
+    def validate_body_weight(self, key, value):
+        if value is not None and not 0 < value <= 500:
+            raise ValueError("Body weight must be between 0 and 500 kg")
+        return value
+
+    @classmethod
+    def bump_data_version(cls, user_id):
+        # Atomic increment, so concurrent writers never hand out the same version
+        db.session.execute(
+            db.update(cls)
+            .where(cls.id == user_id)
+            .values(data_version=cls.data_version + 1, data_modified_at=utc_now())
         )
 
-        dates = {d[0] for d in workout_dates}
-        max_streak = 0
-        current_streak = 0
-        previous_date = None
+    def local_date(self, value):
+        # Workout dates without tzinfo are stored as UTC
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(ZoneInfo(self.timezone or 'UTC')).date()
 
-        for d in sorted(dates):
-            if previous_date and (d - previous_date).days == 1:
-                current_streak += 1
-            else:
-                current_streak = 1
-            max_streak = max(max_streak, current_streak)
-            previous_date = d
+    def local_today(self):
+        return self.local_date(datetime.now(timezone.utc))
 
-        return max_streak
+    def get_current_streak(self):
+        # Each DailyActivity row stores the length of the run ending on that day
+        today = self.local_today()
+        latest = (
+            DailyActivity.query
+            .filter(DailyActivity.user_id == self.id, DailyActivity.local_date <= today)
+            .order_by(DailyActivity.local_date.desc())
+            .first()
+        )
+        if latest and latest.local_date >= today - timedelta(days=1):
+            return latest.streak
+        return 0
 
+    def get_longest_streak(self):
+        return self.longest_streak or 0
 
-    def to_dict(self, include_current_streak=False):
+    @timed_serialization
+    def to_dict(self, include_current_streak=False, include_personal_bests=True, current_streak=None):
         data = {
             'id': self.id,
             'username': self.username,
@@ -106,11 +115,17 @@ class User(db.Model, SerializerMixin):
             'avatar': self.avatar,
             'date': self.date.isoformat() if self.date else None,
             'longest_streak': self.longest_streak,
-            'personal_bests': [pb.to_dict() for pb in self.personal_bests]
+            'timezone': self.timezone,
+            'body_weight_kg': self.body_weight_kg,
             # Workouts are typically excluded for User profile to avoid deep nesting
             # 'workouts': [w.to_dict() for w in self.workouts] # Only if needed and carefully managed
         }
-        if include_current_streak:
+        if include_personal_bests:
+            data['personal_bests'] = [pb.to_dict() for pb in self.personal_bests]
+        if current_streak is not None:
+            # Precomputed for a whole page by the caller
+            data['current_streak'] = current_streak
+        elif include_current_streak:
             try:
                 data['current_streak'] = self.get_current_streak()
             except Exception as e:
@@ -145,6 +160,8 @@ class ExerciseTemplate(db.Model, SerializerMixin):
     name = db.Column(db.String(120), nullable=False)
     type = db.Column(db.String(50), nullable=False)
     supports_distance = db.Column(db.Boolean, default=False)
+    # Metabolic equivalent; unset falls back to calories.TYPE_METS for the type
+    met = db.Column(db.Float, nullable=True)
     
     workout_type_id = db.Column(db.Integer, db.ForeignKey('workout_types.id'), nullable=False)
     workout_type = relationship('WorkoutType', back_populates='exercise_templates')
@@ -159,11 +176,15 @@ class ExerciseTemplate(db.Model, SerializerMixin):
             'id': self.id,
             'name': self.name,
             'type': self.type,
-            'supports_distance': self.supports_distance
+            'supports_distance': self.supports_distance,
+            'met': self.met,
         }
 
 class Workout(db.Model, SerializerMixin):
     __tablename__ = "workouts"
+    __table_args__ = (
+        db.Index('ix_workouts_user_id_date_id', 'user_id', 'date', 'id'),
+    )
     serialize_rules = ('-user.workouts', '-workout_type.workouts', '-workout_exercises.workout')
 
     id = db.Column(db.Integer, primary_key=True)
@@ -174,7 +195,7 @@ class Workout(db.Model, SerializerMixin):
     duration = db.Column(db.Integer)
     estimated_calories = db.Column(db.Float)
     
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     workout_type_id = db.Column(db.Integer, db.ForeignKey('workout_types.id'), nullable=False)
 
     user = relationship("User", back_populates="workouts")
@@ -203,11 +224,15 @@ class Workout(db.Model, SerializerMixin):
             raise ValueError("Duration must be a positive number")
         return value
 
-    def calculate_estimated_calories(self, user_weight_kg=70):
-        if self.duration and self.intensity:
-            return round(self.duration * self.intensity * 0.1 * user_weight_kg, 2)
-        return 0.0
-    
+    @classmethod
+    def query_with_details(cls):
+        # Everything to_dict touches, loaded for a whole page in three queries
+        return cls.query.options(
+            joinedload(cls.workout_type),
+            selectinload(cls.workout_exercises).joinedload(WorkoutExercise.exercise_template),
+        )
+
+    @timed_serialization
     def to_dict(self, rules=()):
         # Explicitly build the dictionary for Workout
         return {
@@ -226,6 +251,9 @@ class Workout(db.Model, SerializerMixin):
 
 class WorkoutExercise(db.Model, SerializerMixin):
     __tablename__ = "workout_exercises" 
+    __table_args__ = (
+        db.Index('ix_workout_exercises_workout_id_template_id', 'workout_id', 'exercise_template_id'),
+    )
     serialize_rules = ('-workout.workout_exercises', '-exercise_template.workout_exercises')
 
     id = db.Column(db.Integer, primary_key=True)
@@ -238,6 +266,7 @@ class WorkoutExercise(db.Model, SerializerMixin):
     weight = db.Column(db.Float, nullable=True)
     duration = db.Column(db.Integer, nullable=True) 
     distance = db.Column(db.Float, nullable=True) 
+    estimated_calories = db.Column(db.Float, nullable=True)
 
     workout = relationship("Workout", back_populates="workout_exercises")
     exercise_template = relationship("ExerciseTemplate", back_populates="workout_exercises") 
@@ -257,6 +286,7 @@ class WorkoutExercise(db.Model, SerializerMixin):
             raise ValueError(f'{key.capitalize()} must be a non-negative number.')
         return value
 
+    @timed_serialization
     def to_dict(self):
         return {
             'id': self.id,
@@ -270,14 +300,18 @@ class WorkoutExercise(db.Model, SerializerMixin):
             'weight': self.weight,
             'duration': self.duration,
             'distance': self.distance,
+            'estimated_calories': self.estimated_calories,
         }
 
 class PersonalBest(db.Model, SerializerMixin):
     __tablename__ = "personal_bests"
+    __table_args__ = (
+        db.Index('ix_personal_bests_user_id_exercise_name', 'user_id', 'exercise_name'),
+    )
     serialize_rules = ('-user',)
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     exercise_name = db.Column(db.String, nullable=False)
     max_weight = db.Column(db.Float, nullable=True)
     max_reps = db.Column(db.Integer, nullable=True)
@@ -296,3 +330,145 @@ class PersonalBest(db.Model, SerializerMixin):
         if value is not None and value < 0:
             raise ValueError(f'{key.capitalize()} must be a non-negative number.')
         return value
+
+class DailyActivity(db.Model, SerializerMixin):
+    __tablename__ = "daily_activity"
+    serialize_rules = ('-user',)
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    local_date = db.Column(db.Date, primary_key=True)
+    workout_count = db.Column(db.Integer, nullable=False, default=0)
+    # Length of the consecutive-day run ending on local_date
+    streak = db.Column(db.Integer, nullable=False, default=1)
+
+    user = db.relationship("User", back_populates="daily_activity")
+
+    def __repr__(self):
+        return f"<DailyActivity(user_id={self.user_id}, local_date={self.local_date}, streak={self.streak})>"
+
+class UserStats(db.Model, SerializerMixin):
+    __tablename__ = "user_stats"
+    serialize_rules = ('-user',)
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    total_workouts = db.Column(db.Integer, nullable=False, default=0)
+    total_exercises = db.Column(db.Integer, nullable=False, default=0)
+    total_calories = db.Column(db.Float, nullable=False, default=0)
+    total_duration = db.Column(db.Integer, nullable=False, default=0)
+    total_distance = db.Column(db.Float, nullable=False, default=0)
+
+    user = db.relationship("User", back_populates="stats")
+
+    def __repr__(self):
+        return f"<UserStats(user_id={self.user_id}, total_workouts={self.total_workouts})>"
+
+class WeeklyTraining(db.Model, SerializerMixin):
+    __tablename__ = "weekly_training"
+    serialize_rules = ('-user',)
+
+    # One row per UTC week and workout type; a week that spans two months is
+    # split in two so monthly series can be summed from the same rows
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    week_start = db.Column(db.Date, primary_key=True)
+    month_start = db.Column(db.Date, primary_key=True)
+    workout_type_id = db.Column(db.Integer, db.ForeignKey('workout_types.id'), primary_key=True)
+    workout_count = db.Column(db.Integer, nullable=False, default=0)
+    calories = db.Column(db.Float, nullable=False, default=0)
+    duration = db.Column(db.Integer, nullable=False, default=0)
+    # Sum of sets x reps x weight
+    volume = db.Column(db.Float, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<WeeklyTraining(user_id={self.user_id}, week_start={self.week_start}, workout_type_id={self.workout_type_id})>"
+
+class LeaderboardEntry(db.Model, SerializerMixin):
+    __tablename__ = "leaderboard_entries"
+    __table_args__ = (
+        db.Index('ix_leaderboard_entries_board_score', 'board', 'score'),
+    )
+
+    # "streaks" or "pb:<exercise name>"
+    board = db.Column(db.String(160), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True, index=True)
+    score = db.Column(db.Float, nullable=False)
+
+    def __repr__(self):
+        return f"<LeaderboardEntry(board={self.board}, user_id={self.user_id}, score={self.score})>"
+
+class LeaderboardScore(db.Model, SerializerMixin):
+    __tablename__ = "leaderboard_scores"
+
+    # How many users hold each score, so a rank is a sum over the higher scores
+    board = db.Column(db.String(160), primary_key=True)
+    score = db.Column(db.Float, primary_key=True)
+    user_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<LeaderboardScore(board={self.board}, score={self.score}, user_count={self.user_count})>"
+
+class LeaderboardBucket(db.Model, SerializerMixin):
+    __tablename__ = "leaderboard_buckets"
+
+    # Users per range of scores: level L groups scores by their key // 10**L
+    board = db.Column(db.String(160), primary_key=True)
+    level = db.Column(db.Integer, primary_key=True)
+    bucket = db.Column(db.BigInteger, primary_key=True)
+    user_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<LeaderboardBucket(board={self.board}, level={self.level}, bucket={self.bucket})>"
+
+class BackfillCheckpoint(db.Model, SerializerMixin):
+    __tablename__ = "backfill_checkpoints"
+
+    # Where a resumable batch job stopped; it continues after last_id
+    name = db.Column(db.String(64), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    rows_done = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime(timezone=True), default=utc_now, onupdate=utc_now)
+
+    def __repr__(self):
+        return f"<BackfillCheckpoint(name={self.name}, last_id={self.last_id})>"
+
+class CatalogVersion(db.Model, SerializerMixin):
+    __tablename__ = "catalog_version"
+    SINGLETON_ID = 1
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Changed on every catalog edit; workers compare it against their cached copy
+    version = db.Column(db.String(32), nullable=False)
+
+    def __repr__(self):
+        return f"<CatalogVersion(version={self.version})>"
+
+class DerivedJob(db.Model, SerializerMixin):
+    __tablename__ = "derived_jobs"
+    __table_args__ = (
+        db.Index('ix_derived_jobs_status_id', 'status', 'id'),
+        db.Index('ix_derived_jobs_user_id_status', 'user_id', 'status'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    # pending -> running -> done, or back to pending / failed on error
+    status = db.Column(db.String(16), nullable=False, default='pending')
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    # When the running worker took it; the lease lapses after JOB_LEASE
+    claimed_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    created_at = db.Column(db.DateTime(timezone=True), default=utc_now)
+    updated_at = db.Column(db.DateTime(timezone=True), default=utc_now)
+
+    def __repr__(self):
+        return f"<DerivedJob(id={self.id}, user_id={self.user_id}, status={self.status})>"
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
@@ -0,0 +1,55 @@
+import os
+import threading
+
+
+class HashingBusy(Exception):
+    """Raised instead of queueing when the hashing pool's backlog is full."""
+
+
+def hash_cost(pw_hash):
+    # bcrypt hashes look like $2b$12$<salt+digest>
+    try:
+        return int(pw_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """Runs bcrypt with a per-process cap on concurrent hashes.
+
+    Hashing happens on the calling request thread, which stays busy for the
+    full bcrypt cost. The cap only matters with a threaded worker class
+    (e.g. gunicorn --threads): at most ``max_concurrent`` threads hash at
+    once, up to ``max_pending`` more wait for a turn, and any caller past
+    that gets HashingBusy straight away rather than piling up behind a login
+    storm. With sync workers each process serves one request at a time, so
+    the cap is never reached; login capacity is then simply the number of
+    workers, each hashing on its own core.
+    """
+
+    def __init__(self, bcrypt, rounds=12, max_concurrent=None, max_pending=None):
+        self.bcrypt = bcrypt
+        self.rounds = rounds
+        self.max_concurrent = max_concurrent or os.cpu_count() or 1
+        self.max_pending = self.max_concurrent * 4 if max_pending is None else max_pending
+        self._admitted = threading.BoundedSemaphore(self.max_concurrent + self.max_pending)
+        self._running = threading.BoundedSemaphore(self.max_concurrent)
+
+    def _run(self, fn, *args):
+        if not self._admitted.acquire(blocking=False):
+            raise HashingBusy("Too many password operations in progress")
+        try:
+            # bcrypt releases the GIL, so up to max_concurrent threads hash in parallel
+            with self._running:
+                return fn(*args)
+        finally:
+            self._admitted.release()
+
+    def hash(self, password):
+        return self._run(self.bcrypt.generate_password_hash, password, self.rounds).decode('utf-8')
+
+    def check(self, pw_hash, password):
+        return self._run(self.bcrypt.check_password_hash, pw_hash, password)
+
+    def needs_rehash(self, pw_hash):
+        return hash_cost(pw_hash) != self.rounds
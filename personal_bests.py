@@ -0,0 +1,165 @@
+from collections import namedtuple
+from datetime import timezone
+from sqlalchemy import func
+from models import db, Workout, ExerciseTemplate, WorkoutExercise, PersonalBest
+
+PB_METRICS = (
+    ("max_weight", "weight"),
+    ("max_reps", "reps"),
+    ("max_duration", "duration"),
+    ("max_distance", "distance"),
+)
+
+# A WorkoutExercise flattened to what the PB engine needs. Snapshots are taken
+# before an edit/delete so the removed values survive the flush.
+PBEntry = namedtuple("PBEntry", ["exercise_name", "date", "weight", "reps", "duration", "distance"])
+
+
+def _as_utc(value):
+    # SQLite hands back naive datetimes for timezone-aware columns
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def snapshot_pb_entries(workout_ids):
+    if not workout_ids:
+        return []
+    rows = (
+        db.session.query(
+            ExerciseTemplate.name,
+            Workout.date,
+            WorkoutExercise.weight,
+            WorkoutExercise.reps,
+            WorkoutExercise.duration,
+            WorkoutExercise.distance,
+        )
+        .join(ExerciseTemplate, WorkoutExercise.exercise_template_id == ExerciseTemplate.id)
+        .join(Workout, WorkoutExercise.workout_id == Workout.id)
+        .filter(WorkoutExercise.workout_id.in_(list(workout_ids)))
+        .all()
+    )
+    return [PBEntry(*row) for row in rows]
+
+
+def _load_personal_bests(user_id, names):
+    pbs = (
+        PersonalBest.query
+        .filter(PersonalBest.user_id == user_id, PersonalBest.exercise_name.in_(list(names)))
+        .order_by(PersonalBest.id)
+        .all()
+    )
+    by_name = {}
+    for pb in pbs:
+        by_name.setdefault(pb.exercise_name, pb)
+    return by_name
+
+
+def recompute_personal_bests(user_id, names):
+    names = list(names)
+    if not names:
+        return
+
+    maxima = (
+        db.session.query(
+            ExerciseTemplate.name.label("exercise_name"),
+            func.max(WorkoutExercise.weight).label("max_weight"),
+            func.max(WorkoutExercise.reps).label("max_reps"),
+            func.max(WorkoutExercise.duration).label("max_duration"),
+            func.max(WorkoutExercise.distance).label("max_distance")
+        )
+        .join(ExerciseTemplate, WorkoutExercise.exercise_template_id == ExerciseTemplate.id)
+        .join(Workout, WorkoutExercise.workout_id == Workout.id)
+        .filter(Workout.user_id == user_id, ExerciseTemplate.name.in_(names))
+        .group_by(ExerciseTemplate.name)
+        .subquery()
+    )
+
+    # The record date is when the most recent of the current maxima was first reached
+    achieved = {}
+    for pb_field, we_field in PB_METRICS:
+        first_reached = (
+            db.session.query(maxima.c.exercise_name, func.min(Workout.date))
+            .select_from(WorkoutExercise)
+            .join(ExerciseTemplate, WorkoutExercise.exercise_template_id == ExerciseTemplate.id)
+            .join(Workout, WorkoutExercise.workout_id == Workout.id)
+            .join(maxima, maxima.c.exercise_name == ExerciseTemplate.name)
+            .filter(Workout.user_id == user_id, getattr(WorkoutExercise, we_field) == getattr(maxima.c, pb_field))
+            .group_by(maxima.c.exercise_name)
+            .all()
+        )
+        for name, date in first_reached:
+            date = _as_utc(date)
+            if date is not None and (achieved.get(name) is None or date > achieved[name]):
+                achieved[name] = date
+
+    existing = _load_personal_bests(user_id, names)
+    seen = set()
+    for row in db.session.query(maxima).all():
+        seen.add(row.exercise_name)
+        pb = existing.get(row.exercise_name)
+        if pb is None:
+            pb = PersonalBest(user_id=user_id, exercise_name=row.exercise_name)
+            db.session.add(pb)
+        for pb_field, _ in PB_METRICS:
+            setattr(pb, pb_field, getattr(row, pb_field))
+        pb.date_achieved = achieved.get(row.exercise_name)
+
+    # No history left for these exercises
+    for name, pb in existing.items():
+        if name not in seen:
+            db.session.delete(pb)
+
+
+def apply_personal_bests(user_id, added=(), removed=()):
+    """Bring the user's PBs up to date after WorkoutExercise rows were added and/or removed.
+
+    Added rows are compared against the stored maxima. An exercise is only
+    re-aggregated when it has no PB row yet, when a removed row held one of its
+    maxima, or when a back-dated row beats a record that was set later.
+    """
+    names = {e.exercise_name for e in added} | {e.exercise_name for e in removed}
+    if not names:
+        return
+
+    db.session.flush()
+    current = _load_personal_bests(user_id, names)
+    stale = set()
+
+    for entry in removed:
+        pb = current.get(entry.exercise_name)
+        if pb is None:
+            continue
+        for pb_field, we_field in PB_METRICS:
+            value = getattr(entry, we_field)
+            best = getattr(pb, pb_field)
+            if value is not None and best is not None and value >= best:
+                stale.add(entry.exercise_name)
+                break
+
+    for entry in added:
+        if entry.exercise_name in stale:
+            continue
+        pb = current.get(entry.exercise_name)
+        if pb is None:
+            # Older history may exist without a PB row, so build it from the aggregate
+            stale.add(entry.exercise_name)
+            continue
+
+        improved = False
+        for pb_field, we_field in PB_METRICS:
+            value = getattr(entry, we_field)
+            best = getattr(pb, pb_field)
+            if value is not None and (best is None or value > best):
+                setattr(pb, pb_field, value)
+                improved = True
+
+        if improved:
+            entry_date = _as_utc(entry.date)
+            achieved = _as_utc(pb.date_achieved)
+            if achieved is None or entry_date is None or entry_date >= achieved:
+                pb.date_achieved = entry.date
+            else:
+                stale.add(entry.exercise_name)
+
+    recompute_personal_bests(user_id, stale)
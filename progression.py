@@ -0,0 +1,133 @@
+"""Strength progression for one exercise: estimated 1RM, best set and volume per session.
+
+One SELECT reads the user's weighted sets of the exercise in date order and
+NumPy does the rest: Epley and Brzycki estimates for every set, the best
+set and total volume of each session, and running and rolling maxima of
+the estimate. Results are cached per process, keyed by the user's
+data_version, so they are reused until the user's data next changes (any
+workout write bumps it).
+"""
+import threading
+from collections import OrderedDict
+import numpy as np
+from sqlalchemy import select
+from models import db, User, Workout, WorkoutExercise
+
+ROLLING_WINDOW = 5
+ROLLING_WINDOW_MAX = 100
+PROGRESSION_CACHE_SIZE = 1024
+# Brzycki's formula is undefined from 37 reps
+BRZYCKI_MAX_REPS = 37
+
+
+def epley(weight, reps):
+    return np.where(reps == 1, weight, weight * (1 + reps / 30))
+
+
+def brzycki(weight, reps):
+    valid = reps < BRZYCKI_MAX_REPS
+    return np.where(valid, weight * 36 / np.where(valid, BRZYCKI_MAX_REPS - reps, 1), np.nan)
+
+
+def rolling_max(values, window):
+    """Maximum of each value and the ``window`` - 1 before it."""
+    padded = np.concatenate([np.full(window - 1, -np.inf), values])
+    return np.lib.stride_tricks.sliding_window_view(padded, window).max(axis=1)
+
+
+def _rounded(value):
+    return None if np.isnan(value) else round(float(value), 2)
+
+
+def _set_rows(user_id, template_id):
+    return db.session.execute(
+        select(Workout.id, Workout.date, WorkoutExercise.sets, WorkoutExercise.reps, WorkoutExercise.weight)
+        .join(Workout, WorkoutExercise.workout_id == Workout.id)
+        .where(
+            Workout.user_id == user_id,
+            Workout.date.isnot(None),
+            WorkoutExercise.exercise_template_id == template_id,
+            WorkoutExercise.reps > 0,
+            WorkoutExercise.weight > 0,
+        )
+        .order_by(Workout.date, Workout.id, WorkoutExercise.id)
+    ).all()
+
+
+def compute_progression(rows, window=ROLLING_WINDOW):
+    """Per-session series from (workout id, date, sets, reps, weight) rows grouped by workout."""
+    if not rows:
+        return []
+    workout_ids, dates, sets, reps, weight = zip(*rows)
+    workout_ids = np.array(workout_ids, dtype=np.int64)
+    # Missing sets count as one, as in the training volume rollup
+    sets = np.nan_to_num(np.array(sets, dtype=float), nan=1)
+    reps = np.array(reps, dtype=float)
+    weight = np.array(weight, dtype=float)
+
+    starts = np.flatnonzero(np.concatenate([[True], workout_ids[1:] != workout_ids[:-1]]))
+    session = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(workout_ids))))
+    set_epley = epley(weight, reps)
+    # Rows sorted by session, then estimate, then weight: each session's last row is its best set
+    order = np.lexsort((weight, set_epley, session))
+    best = order[np.append(starts[1:], len(workout_ids)) - 1]
+
+    best_epley = set_epley[best]
+    best_brzycki = brzycki(weight[best], reps[best])
+    volume = np.add.reduceat(sets * reps * weight, starts)
+    set_count = np.add.reduceat(sets, starts)
+    best_to_date = np.maximum.accumulate(best_epley)
+    rolling_best = rolling_max(best_epley, window)
+
+    return [
+        {
+            "workout_id": int(workout_ids[start]),
+            "date": dates[start].isoformat(),
+            "best_set": {"weight": float(weight[i]), "reps": int(reps[i])},
+            "epley_1rm": _rounded(best_epley[n]),
+            "brzycki_1rm": _rounded(best_brzycki[n]),
+            "volume": _rounded(volume[n]),
+            "sets": int(set_count[n]),
+            "best_1rm_to_date": _rounded(best_to_date[n]),
+            "rolling_best_1rm": _rounded(rolling_best[n]),
+        }
+        for n, (start, i) in enumerate(zip(starts, best))
+    ]
+
+
+class ProgressionCache:
+    """Per-process LRU of computed series, each tagged with the data_version it was built from."""
+
+    def __init__(self, size=PROGRESSION_CACHE_SIZE):
+        self._lock = threading.Lock()
+        self._size = size
+        self._entries = OrderedDict()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, version, value):
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+
+
+progression_cache = ProgressionCache()
+
+
+def exercise_progression(user_id, template_id, window=ROLLING_WINDOW):
+    """Cached compute_progression() of ``user_id``'s sets of ``template_id``."""
+    version = db.session.execute(select(User.data_version).where(User.id == user_id)).scalar()
+    key = (user_id, template_id, window)
+    sessions = progression_cache.get(key, version)
+    if sessions is None:
+        sessions = compute_progression(_set_rows(user_id, template_id), window)
+        progression_cache.put(key, version, sessions)
+    return sessions
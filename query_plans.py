@@ -0,0 +1,143 @@
+"""EXPLAIN every query the read endpoints issue and flag full scans of per-user tables.
+
+Run against a populated database with 'flask check-query-plans'. Every
+GET route is called through the test client as an existing user, the
+SELECTs they send are captured from the engine, and each one is explained.
+On PostgreSQL sequential scans are disabled for the EXPLAIN, so a Seq Scan
+left in the plan means no usable index exists rather than that the planner
+preferred one on a small table. Any INSERT, UPDATE or DELETE sent while
+serving those GETs is reported too, since the read path must stay
+side-effect free.
+
+The test suite runs the same check over a small seeded database.
+"""
+from string import Formatter
+from sqlalchemy import event
+from flask_jwt_extended import create_access_token
+from catalog import catalog
+from models import db, User, Workout
+
+# Tables whose rows belong to a user; reading them must never scan the whole table
+PER_USER_TABLES = {
+    "workouts", "workout_exercises", "personal_bests", "daily_activity",
+    "user_stats", "weekly_training", "derived_jobs",
+}
+# GET handlers must never send these
+WRITE_STATEMENTS = {"INSERT", "UPDATE", "DELETE"}
+
+
+# Extra query strings for routes whose filters take another query path
+QUERY_VARIANTS = {
+    "/users": ["limit=20"],
+    "/workouts": ["order=asc&from=2000-01-01&to=2100-01-01", "workout_type_id={workout_type_id}"],
+    "/analytics/timeseries": ["bucket=month&from=2000-01-01"],
+}
+
+
+def endpoint_paths(app, user_id):
+    """Every GET route of ``app``, its URL arguments taken from ``user_id``'s first workout.
+
+    Routes with an argument the user's data cannot fill are left out.
+    """
+    workout = Workout.query.filter_by(user_id=user_id).order_by(Workout.id).first()
+    exercise = workout.workout_exercises[0] if workout is not None and workout.workout_exercises else None
+    template = catalog.get_template(exercise.exercise_template_id) if exercise is not None else None
+    arguments = {
+        "workout_id": workout.id if workout is not None else None,
+        "workout_type_id": workout.workout_type_id if workout is not None else None,
+        "template_id": template.id if template is not None else None,
+        "exercise": template.name if template is not None else "Squats",
+    }
+
+    urls = app.url_map.bind("localhost")
+    paths = []
+    for rule in app.url_map.iter_rules():
+        if "GET" not in rule.methods or rule.endpoint == "static":
+            continue
+        values = {name: arguments.get(name) for name in rule.arguments}
+        if None in values.values():
+            continue
+        path = urls.build(rule.endpoint, values)
+        paths.append(path)
+        for query in QUERY_VARIANTS.get(rule.rule, []):
+            fields = [name for _, name, _, _ in Formatter().parse(query) if name]
+            if all(arguments.get(name) is not None for name in fields):
+                paths.append(f"{path}?{query.format(**arguments)}")
+    return paths
+
+
+def capture_queries(app, user_id):
+    """Call the read endpoints as ``user_id``; returns [(path, statement, parameters)] for every statement sent."""
+    captured = []
+    current = {}
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        captured.append((current.get("path"), statement, parameters))
+
+    headers = {"Authorization": f"Bearer {create_access_token(identity=user_id)}"}
+    client = app.test_client()
+    paths = endpoint_paths(app, user_id)
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        for path in paths:
+            current["path"] = path
+            response = client.get(path, headers=headers)
+            response.get_data()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    return captured
+
+
+def _full_scans(connection, statement, parameters):
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        plan = [row[0] for row in connection.exec_driver_sql("EXPLAIN " + statement, parameters)]
+        return [
+            line.strip() for line in plan
+            if "Seq Scan on " in line and line.split("Seq Scan on ")[1].split()[0] in PER_USER_TABLES
+        ]
+    plan = [row[-1] for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+    return [
+        detail for detail in plan
+        if detail.startswith("SCAN ") and detail.split()[1] in PER_USER_TABLES
+    ]
+
+
+def _is_write(statement):
+    return statement.lstrip().split(None, 1)[0].upper() in WRITE_STATEMENTS
+
+
+def _default_user_id():
+    user_id = db.session.query(Workout.user_id).order_by(Workout.id.desc()).limit(1).scalar()
+    if user_id is None:
+        user_id = db.session.query(User.id).order_by(User.id).limit(1).scalar()
+    return user_id
+
+
+def check_query_plans(app, user_id=None):
+    """Returns a list of problems, empty when every per-user query uses an index and no GET writes."""
+    if user_id is None:
+        user_id = _default_user_id()
+    if user_id is None:
+        return ["No users to run the endpoints as; populate the database first"]
+
+    queries = capture_queries(app, user_id)
+    db.session.rollback()
+
+    problems = [
+        f"{path}: GET sent a write: {' '.join(statement.split())[:120]}"
+        for path, statement, parameters in queries
+        if _is_write(statement)
+    ]
+    seen = set()
+    with db.engine.connect() as connection:
+        for path, statement, parameters in queries:
+            if not statement.lstrip().upper().startswith("SELECT") or statement in seen:
+                continue
+            seen.add(statement)
+            with connection.begin():
+                scans = _full_scans(connection, statement, parameters)
+            if scans:
+                first_line = " ".join(statement.split())[:120]
+                problems.append(f"{path}: {'; '.join(scans)} in: {first_line}")
+    return problems
@@ -1,11 +1,45 @@
 # seed.py
-from app import app, db
-from models import WorkoutType, ExerciseTemplate
-with app.app_context():
-    print("Dropping and recreating tables...")
-    db.drop_all()
-    db.create_all()
+"""Recreate the schema and seed the catalog; with --users, also generate synthetic histories.
 
+    python seed.py
+    python seed.py --users 2000 --workouts-per-user 1000 --exercises-per-workout 5 --days 1095 --seed 42
+
+Scale mode is deterministic for a given --seed. Every user gets at least one
+long streak and steadily progressing weights/distances, so PBs move over time.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from faker import Faker
+from sqlalchemy import insert, text
+from app import app, db, hasher
+from models import User, Workout, WorkoutType, ExerciseTemplate, WorkoutExercise, ZoneInfo
+from catalog import catalog
+from calories import estimate_calories, template_met
+from personal_bests import recompute_personal_bests
+from streaks import rebuild_user_streaks
+from user_stats import rebuild_user_stats
+from training_rollup import rebuild_training
+from leaderboards import rebuild_leaderboards
+
+INSERT_BATCH_ROWS = 50000
+TIMEZONES = ["UTC", "UTC", "Europe/London", "America/New_York", "Africa/Nairobi", "Asia/Tokyo"]
+
+# Approximate values from the Compendium of Physical Activities; templates
+# not listed use the default for their type
+EXERCISE_METS = {
+    "Running": 9.8, "Jump Rope": 11.0, "Cycling": 7.5, "Swimming": 8.0, "Rowing": 7.0,
+    "Bench Press": 5.0, "Deadlift": 6.0, "Squats": 5.5, "Pull-ups": 8.0, "Overhead Press": 5.0,
+    "Hamstring Stretch": 2.3, "Shoulder Stretch": 2.3, "Cat-Cow Pose": 2.5, "Seated Twist": 2.3,
+    "Burpees": 8.0, "Mountain Climbers": 8.0, "Jump Squats": 8.0,
+    "Power Clean": 6.0, "Snatch": 6.0,
+    "Bicep Curls": 3.5, "Tricep Extensions": 3.5, "Lateral Raises": 3.5,
+    "Treadmill Jog": 7.0, "Elliptical": 5.0, "Step Climber": 9.0,
+}
+
+
+def seed_catalog():
     # ------------------ Workout Types ------------------
     print("Seeding workout types...")
     workout_types_data = [
@@ -68,6 +102,7 @@ with app.app_context():
         ExerciseTemplate(
             name=name,
             type=ex_type,
+            met=EXERCISE_METS.get(name),
             workout_type_id=type_lookup[wt_name],
             supports_distance=True if name in {
                 "Running", "Cycling", "Swimming", "Rowing", "Treadmill Jog", "Elliptical", "Step Climber"
@@ -77,6 +112,227 @@ with app.app_context():
     ]
 
     db.session.add_all(exercise_templates)
+    catalog.invalidate()
     db.session.commit()
 
+
+def training_days(rng, count, days):
+    """Day offsets for ``count`` workouts within ``days``: runs of consecutive
+    days (one of them long) separated by rest gaps, oldest first."""
+    long_run = min(count, rng.randint(30, 120))
+    runs = [long_run]
+    remaining = count - long_run
+    while remaining > 0:
+        run = min(remaining, rng.randint(1, 14))
+        runs.append(run)
+        remaining -= run
+    rng.shuffle(runs)
+
+    free = days - count - len(runs)
+    if free < 0:
+        # More workouts than days: train every day, some days twice
+        return sorted(i * days // count for i in range(count))
+
+    weights = [rng.random() for _ in runs]
+    total = sum(weights) or 1
+    offsets = []
+    day = 0
+    for run, weight in zip(runs, weights):
+        day += int(free * weight / total)
+        offsets.extend(range(day, day + run))
+        day += run + 1
+    return offsets
+
+
+class HistoryGenerator:
+    """Builds workout and exercise rows for one user at a time, with explicit ids."""
+
+    def __init__(self, rng, fake, templates, exercises_per_workout, days):
+        self.rng = rng
+        self.exercises_per_workout = exercises_per_workout
+        self.days = days
+        self.end = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.templates_by_type = {}
+        for template in templates:
+            self.templates_by_type.setdefault(template.workout_type_id, []).append(template)
+        self.type_names = {wt.id: wt.name for wt in WorkoutType.query.all()}
+        self.notes = [fake.sentence(nb_words=8) for _ in range(200)]
+        self.adjectives = [fake.word().title() for _ in range(50)]
+        self.next_workout_id = 1
+        self.next_exercise_id = 1
+
+    def _exercise_values(self, template, base, progress):
+        rng = self.rng
+        values = {"sets": None, "reps": None, "weight": None, "duration": None, "distance": None}
+        if template.supports_distance:
+            values["distance"] = round(base * (1 + progress) + rng.uniform(-0.5, 0.5), 2)
+            values["duration"] = int(values["distance"] * rng.uniform(5, 7))
+        elif template.type == "strength":
+            values["sets"] = rng.randint(3, 5)
+            values["reps"] = rng.randint(3, 12)
+            values["weight"] = max(2.5, round((base * (1 + progress) + rng.gauss(0, 2.5)) / 2.5) * 2.5)
+        elif template.type == "cardio":
+            values["sets"] = rng.randint(2, 5)
+            values["reps"] = int(base * (1 + progress)) + rng.randint(-3, 3)
+        else:
+            values["duration"] = rng.randint(1, 10)
+            values["reps"] = rng.randint(5, 15)
+        return values
+
+    def user_history(self, user_id, workout_count, tz_name, body_weight_kg):
+        rng = self.rng
+        # Times are picked on the user's local calendar so consecutive days stay consecutive
+        zone = ZoneInfo(tz_name)
+        start = (self.end - timedelta(days=self.days)).astimezone(zone).replace(hour=0, minute=0)
+        favourite_types = rng.sample(sorted(self.templates_by_type), k=min(3, len(self.templates_by_type)))
+        # Starting level and how much it improves over the whole history, per template
+        bases = {}
+        gains = {}
+
+        workouts, exercises = [], []
+        for index, offset in enumerate(training_days(rng, workout_count, self.days)):
+            workout_type_id = rng.choices(favourite_types, weights=(6, 3, 1)[:len(favourite_types)])[0]
+            duration = rng.randint(20, 90)
+            intensity = round(rng.uniform(3, 9), 1)
+            workout_id = self.next_workout_id
+            self.next_workout_id += 1
+            workout = {
+                "id": workout_id,
+                "date": (start + timedelta(days=offset, hours=rng.randint(6, 21), minutes=rng.randint(0, 59)))
+                .astimezone(timezone.utc),
+                "workout_name": f"{self.type_names[workout_type_id]} {rng.choice(self.adjectives)}",
+                "notes": rng.choice(self.notes) if rng.random() < 0.2 else None,
+                "intensity": intensity,
+                "duration": duration,
+                "user_id": user_id,
+                "workout_type_id": workout_type_id,
+            }
+            workouts.append(workout)
+
+            progress_at = index / max(workout_count - 1, 1)
+            templates = self.templates_by_type[workout_type_id]
+            workout_exercises = []
+            for _ in range(self.exercises_per_workout):
+                template = rng.choice(templates)
+                if template.id not in bases:
+                    bases[template.id] = rng.uniform(3, 8) if template.supports_distance else rng.uniform(20, 100)
+                    gains[template.id] = rng.uniform(0.2, 0.8)
+                values = self._exercise_values(template, bases[template.id], gains[template.id] * progress_at)
+                workout_exercises.append((template, dict(
+                    values, id=self.next_exercise_id, workout_id=workout_id, exercise_template_id=template.id
+                )))
+                self.next_exercise_id += 1
+
+            workout["estimated_calories"], per_exercise = estimate_calories(
+                duration,
+                [(template_met(t), row["sets"], row["reps"], row["duration"]) for t, row in workout_exercises],
+                body_weight_kg,
+            )
+            for (_, row), calories in zip(workout_exercises, per_exercise):
+                row["estimated_calories"] = calories
+                exercises.append(row)
+        return workouts, exercises
+
+
+def seed_scale(args):
+    rng = random.Random(args.seed)
+    fake = Faker()
+    Faker.seed(args.seed)
+
+    templates = ExerciseTemplate.query.order_by(ExerciseTemplate.id).all()
+    generator = HistoryGenerator(rng, fake, templates, args.exercises_per_workout, args.days)
+    password_hash = hasher.hash("password123")
+    started = time.perf_counter()
+
+    print(f"Seeding {args.users} users...")
+    users = []
+    for user_id in range(1, args.users + 1):
+        username = f"{fake.user_name()}{user_id}"
+        users.append({
+            "id": user_id,
+            "username": username,
+            "email": f"{username}@{fake.free_email_domain()}",
+            "password_hash": password_hash,
+            "avatar": None,
+            "date": generator.end - timedelta(days=args.days + rng.randint(1, 30)),
+            "longest_streak": 0,
+            "timezone": rng.choice(TIMEZONES),
+            "body_weight_kg": round(rng.uniform(50, 110), 1),
+            "data_version": 0,
+            "data_modified_at": generator.end,
+        })
+    db.session.execute(insert(User), users)
+
+    workout_rows, exercise_rows = [], []
+
+    def flush_rows():
+        if workout_rows:
+            db.session.execute(insert(Workout.__table__), workout_rows)
+        if exercise_rows:
+            db.session.execute(insert(WorkoutExercise.__table__), exercise_rows)
+        db.session.commit()
+        workout_rows.clear()
+        exercise_rows.clear()
+
+    for user in users:
+        # Spread workout counts around the requested average
+        count = max(1, int(args.workouts_per_user * rng.uniform(0.5, 1.5)))
+        workouts, exercises = generator.user_history(user["id"], count, user["timezone"], user["body_weight_kg"])
+        workout_rows.extend(workouts)
+        exercise_rows.extend(exercises)
+        if len(exercise_rows) >= INSERT_BATCH_ROWS:
+            flush_rows()
+            elapsed = time.perf_counter() - started
+            print(f"  {generator.next_exercise_id - 1} exercises, user {user['id']}/{args.users}, {elapsed:.0f}s")
+    flush_rows()
+
+    if db.engine.dialect.name == "postgresql":
+        # Rows were inserted with explicit ids
+        for table in ("users", "workouts", "workout_exercises"):
+            db.session.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))"))
+        db.session.commit()
+
+    print(f"Inserted {generator.next_workout_id - 1} workouts and {generator.next_exercise_id - 1} exercises "
+          f"in {time.perf_counter() - started:.0f}s.")
+    if args.skip_derived:
+        print("Skipped streaks, stats, PBs, weekly rollups and leaderboards.")
+        return
+
+    print("Building streaks, stats, PBs, weekly rollups and leaderboards...")
+    names = [template.name for template in templates]
+    for (user_id,) in db.session.query(User.id).order_by(User.id).all():
+        user = db.session.get(User, user_id)
+        rebuild_user_streaks(user)
+        rebuild_user_stats(user.id)
+        rebuild_training(user.id)
+        recompute_personal_bests(user.id, names)
+        if user.id % 100 == 0:
+            db.session.commit()
+            print(f"  user {user.id}/{args.users}, {time.perf_counter() - started:.0f}s")
+    rebuild_leaderboards()
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=0, help="Synthetic users to generate (0 seeds only the catalog)")
+    parser.add_argument("--workouts-per-user", type=int, default=100, help="Average workouts per user")
+    parser.add_argument("--exercises-per-workout", type=int, default=4)
+    parser.add_argument("--days", type=int, default=365, help="Date span of each history, ending today")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-derived", action="store_true", help="Skip rebuilding streaks, stats and PBs")
+    args = parser.parse_args()
+
+    with app.app_context():
+        print("Dropping and recreating tables...")
+        db.drop_all()
+        db.create_all()
+        seed_catalog()
+        if args.users:
+            seed_scale(args)
+
     print("✅ Seeding complete.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Response dicts built straight from Core rows, skipping ORM hydration.
+
+Each serializer selects its columns in the key order of the matching
+to_dict, so a row becomes a dict with one dict(zip(...)) plus a few fixups,
+and the JSON is identical to what the ORM path produces.
+"""
+from sqlalchemy import select
+from instrumentation import timed_serialization
+from models import db, User, Workout, WorkoutType, WorkoutExercise, ExerciseTemplate, PersonalBest
+
+# Matches SerializerMixin's default, which PersonalBest.to_dict uses
+PB_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+WORKOUT_COLUMNS = (
+    Workout.id, Workout.date, Workout.workout_name, Workout.notes, Workout.intensity,
+    Workout.duration, Workout.estimated_calories, Workout.user_id, Workout.workout_type_id,
+    WorkoutType.name.label('workout_type_name'),
+)
+WORKOUT_KEYS = tuple(c.key for c in WORKOUT_COLUMNS)
+
+EXERCISE_COLUMNS = (
+    WorkoutExercise.id, WorkoutExercise.workout_id, WorkoutExercise.exercise_template_id,
+    ExerciseTemplate.name, ExerciseTemplate.type, ExerciseTemplate.supports_distance,
+    WorkoutExercise.sets, WorkoutExercise.reps, WorkoutExercise.weight,
+    WorkoutExercise.duration, WorkoutExercise.distance, WorkoutExercise.estimated_calories,
+)
+EXERCISE_KEYS = tuple(c.key for c in EXERCISE_COLUMNS)
+
+PB_COLUMNS = tuple(PersonalBest.__table__.columns)
+PB_KEYS = tuple(c.key for c in PB_COLUMNS)
+
+USER_COLUMNS = (
+    User.id, User.username, User.email, User.avatar, User.date, User.longest_streak, User.timezone,
+    User.body_weight_kg,
+)
+USER_KEYS = tuple(c.key for c in USER_COLUMNS)
+
+
+def workout_select():
+    """SELECT of the Workout.to_dict columns; add filters and ordering as for Workout.query."""
+    return select(*WORKOUT_COLUMNS).outerjoin(WorkoutType, Workout.workout_type_id == WorkoutType.id)
+
+
+def exercise_dicts(workout_ids):
+    """WorkoutExercise.to_dict for every exercise of ``workout_ids``, grouped by workout id."""
+    grouped = {}
+    if not workout_ids:
+        return grouped
+    rows = db.session.execute(
+        select(*EXERCISE_COLUMNS)
+        .join(ExerciseTemplate, WorkoutExercise.exercise_template_id == ExerciseTemplate.id)
+        .where(WorkoutExercise.workout_id.in_(list(workout_ids)))
+        .order_by(WorkoutExercise.id)
+    )
+    keys = EXERCISE_KEYS
+    for row in rows:
+        grouped.setdefault(row.workout_id, []).append(dict(zip(keys, row)))
+    return grouped
+
+
+@timed_serialization
+def workout_dicts(rows):
+    """Workout.to_dict for rows of workout_select(), loading their exercises in one query."""
+    exercises = exercise_dicts([row.id for row in rows])
+    keys = WORKOUT_KEYS
+    result = []
+    for row in rows:
+        data = dict(zip(keys, row))
+        if data['date'] is not None:
+            data['date'] = data['date'].isoformat()
+        data['exercises'] = exercises.get(row.id, [])
+        result.append(data)
+    return result
+
+
+@timed_serialization
+def personal_best_dict(row):
+    data = dict(zip(PB_KEYS, row))
+    if data['date_achieved'] is not None:
+        data['date_achieved'] = data['date_achieved'].strftime(PB_DATETIME_FORMAT)
+    return data
+
+
+def personal_best_select():
+    return select(*PB_COLUMNS)
+
+
+@timed_serialization
+def personal_best_dicts(user_ids):
+    """PersonalBest.to_dict for each of ``user_ids``' PBs, grouped by user id."""
+    grouped = {user_id: [] for user_id in user_ids}
+    if not grouped:
+        return grouped
+    rows = db.session.execute(
+        personal_best_select()
+        .where(PersonalBest.user_id.in_(list(grouped)))
+        .order_by(PersonalBest.id)
+    )
+    for row in rows:
+        grouped[row.user_id].append(personal_best_dict(row))
+    return grouped
+
+
+def user_select():
+    return select(*USER_COLUMNS)
+
+
+@timed_serialization
+def user_dict(row, personal_bests=None, current_streak=None):
+    """User.to_dict for a row of user_select(); PBs and streak are included when given."""
+    data = dict(zip(USER_KEYS, row))
+    if data['date'] is not None:
+        data['date'] = data['date'].isoformat()
+    if personal_bests is not None:
+        data['personal_bests'] = personal_bests
+    if current_streak is not None:
+        data['current_streak'] = current_streak
+    return data
@@ -0,0 +1,165 @@
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, insert
+from models import db, Workout, DailyActivity, ZoneInfo
+
+STREAK_WALK_BATCH = 64
+
+
+def _iter_days_from(user_id, start):
+    # Keyset pages so a walk only reads as far as the run it is repairing
+    last = None
+    while True:
+        query = DailyActivity.query.filter(DailyActivity.user_id == user_id)
+        if last is None:
+            query = query.filter(DailyActivity.local_date >= start)
+        else:
+            query = query.filter(DailyActivity.local_date > last)
+        batch = query.order_by(DailyActivity.local_date).limit(STREAK_WALK_BATCH).all()
+        yield from batch
+        if len(batch) < STREAK_WALK_BATCH:
+            return
+        last = batch[-1].local_date
+
+
+def _restreak_from(user_id, start, through):
+    """Recompute run lengths from ``start`` forward, stopping once past ``through``
+    and the stored values agree again.
+
+    Returns the highest new run length written and the highest stored value it replaced.
+    """
+    prev_date = start - timedelta(days=1)
+    before = db.session.get(DailyActivity, (user_id, prev_date))
+    prev_streak = before.streak if before else 0
+    new_max = old_max = 0
+
+    for day in _iter_days_from(user_id, start):
+        streak = prev_streak + 1 if day.local_date == prev_date + timedelta(days=1) else 1
+        if day.local_date > through and day.streak == streak:
+            break
+        old_max = max(old_max, day.streak or 0)
+        day.streak = streak
+        new_max = max(new_max, streak)
+        prev_date, prev_streak = day.local_date, streak
+
+    return new_max, old_max
+
+
+def update_user_streaks(user, added=(), removed=()):
+    """Apply workout dates that were added to and/or removed from ``user``'s history.
+
+    Moving a workout is a removal of its old date plus an addition of the new one.
+    Only days that became active or inactive touch the stored run lengths, and
+    a whole batch of them is repaired in a single forward walk.
+    """
+    deltas = Counter()
+    for value in added:
+        if value is not None:
+            deltas[user.local_date(value)] += 1
+    for value in removed:
+        if value is not None:
+            deltas[user.local_date(value)] -= 1
+    deltas = {day: delta for day, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    existing = {
+        row.local_date: row
+        for row in DailyActivity.query.filter(
+            DailyActivity.user_id == user.id, DailyActivity.local_date.in_(list(deltas))
+        )
+    }
+
+    dirty = []
+    lost = 0
+    for day, delta in sorted(deltas.items()):
+        row = existing.get(day)
+        if row is None:
+            if delta > 0:
+                db.session.add(DailyActivity(user_id=user.id, local_date=day, workout_count=delta, streak=0))
+                dirty.append(day)
+            continue
+        row.workout_count += delta
+        if row.workout_count <= 0:
+            lost = max(lost, row.streak)
+            db.session.delete(row)
+            dirty.append(day)
+
+    if not dirty:
+        return
+
+    db.session.flush()
+    new_max, old_max = _restreak_from(user.id, dirty[0], dirty[-1])
+    longest = max(user.longest_streak or 0, new_max)
+
+    # A run that may have held the record was shortened
+    if lost and max(lost, old_max) >= (user.longest_streak or 0):
+        longest = (
+            db.session.query(func.max(DailyActivity.streak))
+            .filter(DailyActivity.user_id == user.id)
+            .scalar()
+        ) or 0
+
+    user.longest_streak = longest
+
+
+def rebuild_user_streaks(user, queued_added=(), queued_removed=()):
+    """Rebuild ``user``'s daily activity from scratch, e.g. after a timezone change.
+
+    Workout dates still queued for the worker are left out, as in
+    rebuild_user_stats(), so applying their jobs later doesn't count them twice.
+    """
+    DailyActivity.query.filter_by(user_id=user.id).delete()
+
+    counts = Counter(
+        user.local_date(date)
+        for (date,) in db.session.query(Workout.date).filter(Workout.user_id == user.id).yield_per(1000)
+        if date is not None
+    )
+    counts.subtract(user.local_date(date) for date in queued_added if date is not None)
+    counts.update(user.local_date(date) for date in queued_removed if date is not None)
+    counts = +counts
+
+    rows = []
+    prev_date = None
+    streak = longest = 0
+    for day in sorted(counts):
+        streak = streak + 1 if prev_date and day == prev_date + timedelta(days=1) else 1
+        longest = max(longest, streak)
+        rows.append({"user_id": user.id, "local_date": day, "workout_count": counts[day], "streak": streak})
+        prev_date = day
+
+    if rows:
+        db.session.execute(insert(DailyActivity), rows)
+    user.longest_streak = longest
+
+
+def current_streaks(users):
+    """Current streak for each of ``users`` from a single DailyActivity query.
+
+    ``users`` can be User objects or any rows with ``id`` and ``timezone``.
+    """
+    if not users:
+        return {}
+    today_utc = datetime.now(timezone.utc).date()
+    todays = {user.id: datetime.now(ZoneInfo(user.timezone or 'UTC')).date() for user in users}
+
+    # Local "today" is within a day of UTC in every zone, so this window
+    # holds each user's latest relevant day
+    rows = (
+        DailyActivity.query
+        .filter(
+            DailyActivity.user_id.in_(list(todays)),
+            DailyActivity.local_date >= today_utc - timedelta(days=2),
+            DailyActivity.local_date <= today_utc + timedelta(days=1),
+        )
+        .order_by(DailyActivity.user_id, DailyActivity.local_date)
+        .all()
+    )
+
+    streaks = dict.fromkeys(todays, 0)
+    for row in rows:
+        today = todays[row.user_id]
+        if today - timedelta(days=1) <= row.local_date <= today:
+            streaks[row.user_id] = row.streak
+    return streaks
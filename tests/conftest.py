@@ -0,0 +1,93 @@
+import os
+
+# Configure before app.py reads the environment on import
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["DERIVED_JOBS_INLINE"] = "true"
+os.environ["BCRYPT_LOG_ROUNDS"] = "4"
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event
+import progression
+from app import app as flask_app
+from catalog import catalog
+from models import db, WorkoutType, ExerciseTemplate
+
+
+@pytest.fixture
+def app():
+    # The catalog is only checked once per test, so it adds no queries mid-test
+    flask_app.config.update(TESTING=True, CATALOG_CHECK_SECONDS=3600)
+    # Ids and data versions start over with every database, so cached series must too
+    progression.progression_cache = progression.ProgressionCache()
+    with flask_app.app_context():
+        db.create_all()
+        strength = WorkoutType(name="Strength")
+        cardio = WorkoutType(name="Cardio")
+        db.session.add_all([strength, cardio])
+        db.session.flush()
+        db.session.add_all([
+            ExerciseTemplate(name="Squats", type="strength", workout_type_id=strength.id),
+            ExerciseTemplate(name="Bench Press", type="strength", workout_type_id=strength.id),
+            ExerciseTemplate(name="Deadlift", type="strength", workout_type_id=strength.id),
+            ExerciseTemplate(name="Running", type="cardio", supports_distance=True, workout_type_id=cardio.id),
+        ])
+        catalog.invalidate()
+        db.session.commit()
+        catalog.ensure_fresh(force=True)
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(client):
+    response = client.post(
+        "/register", json={"username": "lifter", "email": "lifter@example.com", "password": "correct horse"}
+    )
+    return {"Authorization": f"Bearer {response.get_json()['access_token']}"}
+
+
+@pytest.fixture
+def add_workouts(client, auth_headers):
+    """Bulk-create ``count`` strength workouts of ``exercises`` exercises each; returns their ids."""
+    def add(count, exercises=1, start=datetime(2024, 1, 1)):
+        templates = [t.id for t in catalog.templates.values() if t.type == "strength"]
+        workouts = [
+            {
+                "workout_name": f"Session {i}",
+                "date": (start + timedelta(days=i)).isoformat(),
+                "workout_type_id": catalog.find_workout_type("Strength").id,
+                "duration": 45,
+                "exercises": [
+                    {"exercise_template_id": templates[j % len(templates)], "sets": 3, "reps": 5, "weight": 60 + i + j}
+                    for j in range(exercises)
+                ],
+            }
+            for i in range(count)
+        ]
+        response = client.post("/workouts/bulk", headers=auth_headers, json=workouts)
+        assert response.status_code == 201, response.get_json()
+        return [result["id"] for result in response.get_json()["results"]]
+    return add
+
+
+@contextmanager
+def recorded_statements():
+    """Collect the SQL statements sent while the block runs."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
@@ -0,0 +1,64 @@
+"""The calorie backfill matches the per-workout estimates, keeps the rollups consistent and resumes."""
+import pytest
+from sqlalchemy import update
+from calorie_backfill import BACKFILL_NAME, backfill_calories
+from models import db, User, Workout, WorkoutExercise, UserStats, WeeklyTraining, BackfillCheckpoint
+from training_rollup import rebuild_training
+from user_stats import rebuild_user_stats
+
+
+class Interrupted(Exception):
+    pass
+
+
+def calories():
+    db.session.expire_all()
+    return (
+        {w.id: w.estimated_calories for w in Workout.query},
+        {e.id: e.estimated_calories for e in WorkoutExercise.query},
+    )
+
+
+def rollups(user_id):
+    db.session.expire_all()
+    stats = db.session.get(UserStats, user_id)
+    return (
+        round(stats.total_calories, 6),
+        sorted((row.week_start, row.workout_type_id, round(row.calories, 6))
+               for row in WeeklyTraining.query.filter_by(user_id=user_id)),
+    )
+
+
+def test_backfill_resumes_from_its_checkpoint(app, add_workouts):
+    add_workouts(7, exercises=3)
+    user_id = User.query.filter_by(username="lifter").one().id
+    expected_workouts, expected_exercises = calories()
+    # Stored by an older formula, with rollups that agree with them
+    db.session.execute(update(Workout).values(estimated_calories=Workout.duration * 3))
+    db.session.execute(update(WorkoutExercise).values(estimated_calories=None))
+    rebuild_user_stats(user_id)
+    rebuild_training(user_id)
+    db.session.commit()
+
+    def stop_after_first_chunk(message):
+        raise Interrupted(message)
+
+    with pytest.raises(Interrupted):
+        backfill_calories(chunk_size=3, report=stop_after_first_chunk)
+    db.session.rollback()
+    checkpoint = db.session.get(BackfillCheckpoint, BACKFILL_NAME)
+    assert checkpoint.rows_done == 3
+    resume_after = checkpoint.last_id
+    done_workouts, _ = calories()
+    assert [done_workouts[i] == expected_workouts[i] for i in sorted(expected_workouts)] == [True] * 3 + [False] * 4
+
+    messages = []
+    assert backfill_calories(chunk_size=3, report=messages.append) == 4
+    assert messages[0] == f"Resuming after workout {resume_after} (3 already done)."
+
+    assert calories() == (pytest.approx(expected_workouts), pytest.approx(expected_exercises))
+    incremental = rollups(user_id)
+    rebuild_user_stats(user_id)
+    rebuild_training(user_id)
+    db.session.flush()
+    assert rollups(user_id) == incremental
@@ -0,0 +1,135 @@
+"""Incrementally maintained PBs, streaks, stats and weekly training match a full rebuild.
+
+The same history of inserts, back-dated entries, edits and deletes is
+played through the API with derived data applied inline by the request,
+by the worker after every write, and by the worker once at the end (so
+queued deltas merge). Each check compares the stored rows with what the
+rebuild functions produce from the workout tables.
+"""
+import pytest
+from catalog import catalog
+from derived_jobs import drain_jobs
+from models import db, User, PersonalBest, DailyActivity, UserStats, WeeklyTraining
+from personal_bests import recompute_personal_bests
+from streaks import rebuild_user_streaks
+from training_rollup import rebuild_training
+from user_stats import WorkoutTotals, rebuild_user_stats
+
+SQUATS, BENCH, DEADLIFT, RUNNING = 1, 2, 3, 4
+STRENGTH, CARDIO = 1, 2
+
+
+def derived_state(user_id):
+    db.session.expire_all()
+    stats = db.session.get(UserStats, user_id)
+    return {
+        "personal_bests": sorted(
+            (pb.exercise_name, pb.max_weight, pb.max_reps, pb.max_duration, pb.max_distance, pb.date_achieved)
+            for pb in PersonalBest.query.filter_by(user_id=user_id)
+        ),
+        "daily_activity": sorted(
+            (day.local_date, day.workout_count, day.streak) for day in DailyActivity.query.filter_by(user_id=user_id)
+        ),
+        "longest_streak": db.session.get(User, user_id).longest_streak,
+        "stats": tuple(round(getattr(stats, field), 6) for field in WorkoutTotals._fields) if stats else None,
+        "training": sorted(
+            (row.week_start, row.month_start, row.workout_type_id, row.workout_count,
+             round(row.calories, 6), row.duration, round(row.volume, 6))
+            for row in WeeklyTraining.query.filter_by(user_id=user_id)
+        ),
+    }
+
+
+def assert_matches_rebuild(user_id):
+    incremental = derived_state(user_id)
+    user = db.session.get(User, user_id)
+    recompute_personal_bests(user_id, [template.name for template in catalog.templates.values()])
+    rebuild_user_streaks(user)
+    rebuild_user_stats(user_id)
+    rebuild_training(user_id)
+    db.session.flush()
+    rebuilt = derived_state(user_id)
+    db.session.rollback()
+    assert incremental == rebuilt
+
+
+class History:
+    def __init__(self, client, auth_headers):
+        self.client = client
+        self.headers = auth_headers
+        self.ids = {}
+
+    def add(self, key, date, exercises, workout_type_id=STRENGTH, duration=45):
+        response = self.client.post("/workouts", headers=self.headers, json={
+            "workout_name": key, "date": date, "workout_type_id": workout_type_id,
+            "duration": duration, "exercises": exercises,
+        })
+        assert response.status_code == 201, response.get_json()
+        self.ids[key] = response.get_json()["id"]
+
+    def patch(self, key, **changes):
+        response = self.client.patch(f"/workouts/{self.ids[key]}", headers=self.headers, json=changes)
+        assert response.status_code == 200, response.get_json()
+
+    def exercises(self, key):
+        return self.client.get(f"/workouts/{self.ids[key]}", headers=self.headers).get_json()["exercises"]
+
+    def delete(self, key):
+        response = self.client.delete(f"/workouts/{self.ids[key]}", headers=self.headers)
+        assert response.status_code == 200, response.get_json()
+
+
+def squats(weight, reps=5, sets=3):
+    return {"exercise_template_id": SQUATS, "weight": weight, "reps": reps, "sets": sets}
+
+
+def play(history):
+    """Yield after each write of a history that exercises every incremental path."""
+    history.add("first", "2024-03-01T07:00:00", [squats(100)])
+    yield
+    history.add("record", "2024-03-02T07:00:00", [
+        squats(120), {"exercise_template_id": BENCH, "weight": 80, "reps": 8, "sets": 3},
+    ])
+    yield
+    # A second workout on the same day
+    history.add("run", "2024-03-02T18:00:00",
+                [{"exercise_template_id": RUNNING, "distance": 5.0, "duration": 30}], CARDIO, 30)
+    yield
+    # Back-dated entry that beats the record set later
+    history.add("backdated", "2024-02-20T07:00:00", [squats(130, reps=3)])
+    yield
+    history.add("tie", "2024-03-03T07:00:00", [squats(130, reps=3), {"exercise_template_id": DEADLIFT, "weight": 150}])
+    yield
+    # Lower the old record holder and move it a day, across the streak
+    record = history.exercises("record")
+    history.patch("record", date="2024-03-04T07:00:00", exercises=[
+        {"id": exercise["id"], "exercise_template_id": exercise["exercise_template_id"],
+         "weight": 90 if exercise["exercise_template_id"] == SQUATS else exercise["weight"]}
+        for exercise in record
+    ])
+    yield
+    history.delete("backdated")
+    yield
+    history.delete("run")
+    yield
+    history.patch("tie", exercises=[])
+    yield
+    history.patch("first", date="2024-05-01T07:00:00", duration=60)
+    yield
+
+
+@pytest.mark.parametrize("mode", ["inline", "worker", "batched"])
+def test_incremental_derived_data_matches_rebuild(app, client, auth_headers, monkeypatch, mode):
+    if mode != "inline":
+        monkeypatch.setitem(app.config, "DERIVED_JOBS_INLINE", False)
+    user_id = User.query.filter_by(username="lifter").one().id
+
+    for _ in play(History(client, auth_headers)):
+        if mode == "worker":
+            drain_jobs()
+        if mode != "batched":
+            assert_matches_rebuild(user_id)
+
+    drain_jobs()
+    assert_matches_rebuild(user_id)
+    assert derived_state(user_id)["personal_bests"]
@@ -0,0 +1,51 @@
+"""The derived-data job queue: strict per-user order, inline retries and blocked queues."""
+from datetime import datetime
+import pytest
+import derived_jobs
+from derived_jobs import JOB_MAX_ATTEMPTS, blocked_users, drain_jobs, requeue_failed_jobs
+from models import db, DerivedJob
+
+
+@pytest.fixture
+def failing_jobs(monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("rollup unavailable")
+    monkeypatch.setattr(derived_jobs, "apply_training", fail)
+    return monkeypatch
+
+
+def jobs():
+    db.session.expire_all()
+    return [(job.status, job.attempts) for job in DerivedJob.query.order_by(DerivedJob.id)]
+
+
+def test_inline_requests_try_a_job_once_and_leave_retries_to_the_worker(client, auth_headers, add_workouts,
+                                                                        failing_jobs):
+    add_workouts(1)
+    assert jobs() == [("pending", 1)]
+    # Merged into the waiting job, which the request does not try again
+    add_workouts(1, start=datetime(2024, 2, 1))
+    assert jobs() == [("pending", 1)]
+
+    failing_jobs.undo()
+    assert drain_jobs() == 1
+    assert jobs() == [("done", 2)]
+    assert client.get("/progress", headers=auth_headers).get_json()["totalWorkouts"] == 2
+
+
+def test_permanently_failed_job_is_reported_as_blocking(client, auth_headers, add_workouts, failing_jobs):
+    add_workouts(1)
+    drain_jobs()
+    assert jobs() == [("failed", JOB_MAX_ATTEMPTS)]
+    add_workouts(1)
+
+    status = client.get("/derived-data/status", headers=auth_headers).get_json()
+    assert status["blocked"] is True
+    user_id = DerivedJob.query.first().user_id
+    assert blocked_users() == {user_id: 1}
+
+    failing_jobs.undo()
+    assert requeue_failed_jobs(user_id) == 1
+    drain_jobs()
+    assert blocked_users() == {}
+    assert client.get("/derived-data/status", headers=auth_headers).get_json()["blocked"] is False
@@ -0,0 +1,95 @@
+"""Leaderboards maintained on every score change match a rebuild, and ranks match a brute-force count."""
+import random
+from sqlalchemy import select
+from leaderboards import (STREAK_BOARD, pb_board, rebuild_leaderboards, remove_user, top_entries, update_leaderboards,
+                          user_rank)
+from models import db, User, PersonalBest, LeaderboardEntry, LeaderboardScore, LeaderboardBucket
+
+SQUATS_BOARD = pb_board("Squats")
+# Ties, two-decimal scores and neighbours of bucket boundaries at several levels
+SCORES = [0.01, 0.5, 9.99, 10, 10.01, 99.99, 100, 100, 100.25, 999.99, 1000, 12345.67, 99999.99, 100000, 250000.5]
+
+
+def board_state():
+    return {
+        "entries": sorted(db.session.execute(select(LeaderboardEntry.board, LeaderboardEntry.user_id,
+                                                    LeaderboardEntry.score)).all()),
+        "scores": sorted(db.session.execute(select(LeaderboardScore.board, LeaderboardScore.score,
+                                                   LeaderboardScore.user_count)).all()),
+        "buckets": sorted(db.session.execute(select(LeaderboardBucket.board, LeaderboardBucket.level,
+                                                    LeaderboardBucket.bucket, LeaderboardBucket.user_count)).all()),
+    }
+
+
+def assert_matches_rebuild_and_brute_force():
+    db.session.flush()
+    incremental = board_state()
+    rebuild_leaderboards()
+    db.session.flush()
+    assert board_state() == incremental
+
+    for board in (STREAK_BOARD, SQUATS_BOARD):
+        scores = {user_id: score for entry_board, user_id, score in incremental["entries"] if entry_board == board}
+        for user_id, score in scores.items():
+            expected = 1 + sum(1 for other in scores.values() if other > score)
+            assert user_rank(board, user_id)[0] == expected, (board, score)
+        for entry in top_entries(board, limit=len(scores)):
+            assert entry["rank"] == 1 + sum(1 for other in scores.values() if other > scores[entry["user_id"]])
+
+
+def set_squat_pb(user_id, weight):
+    pb = PersonalBest.query.filter_by(user_id=user_id, exercise_name="Squats").first()
+    if weight is None:
+        if pb is not None:
+            db.session.delete(pb)
+    elif pb is None:
+        db.session.add(PersonalBest(user_id=user_id, exercise_name="Squats", max_weight=weight))
+    else:
+        pb.max_weight = weight
+
+
+def set_streak(user_id, days):
+    db.session.get(User, user_id).longest_streak = days
+
+
+def test_incremental_leaderboards_match_rebuild(app):
+    rng = random.Random(7)
+    users = [User(username=f"athlete{i}", email=f"athlete{i}@example.com", password_hash="x") for i in range(40)]
+    db.session.add_all(users)
+    db.session.flush()
+    user_ids = [user.id for user in users]
+
+    for user_id in user_ids:
+        set_squat_pb(user_id, rng.choice(SCORES + [rng.uniform(0, 500)]))
+        set_streak(user_id, rng.choice([0, 1, 1, 3, 7, 7, 30, 365]))
+        update_leaderboards(user_id, ["Squats"])
+    assert_matches_rebuild_and_brute_force()
+
+    for round_ in range(4):
+        for user_id in rng.sample(user_ids, 15):
+            change = rng.random()
+            if change < 0.15:
+                set_squat_pb(user_id, None)
+            elif change < 0.3:
+                # Everyone converging on one score
+                set_squat_pb(user_id, 100)
+            else:
+                set_squat_pb(user_id, rng.choice(SCORES + [round(rng.uniform(0, 1000), 3)]))
+            set_streak(user_id, rng.choice([0, 2, 7, 30]))
+            update_leaderboards(user_id, ["Squats"])
+        removed = user_ids.pop(rng.randrange(len(user_ids)))
+        remove_user(removed)
+        db.session.delete(db.session.get(User, removed))
+        assert_matches_rebuild_and_brute_force()
+
+
+def test_tied_users_share_a_rank(app):
+    users = [User(username=f"tied{i}", email=f"tied{i}@example.com", password_hash="x") for i in range(4)]
+    db.session.add_all(users)
+    db.session.flush()
+    for user, weight in zip(users, [150, 120.004, 120, 90]):
+        set_squat_pb(user.id, weight)
+        update_leaderboards(user.id, ["Squats"], streak=False)
+
+    assert [user_rank(SQUATS_BOARD, user.id) for user in users] == [(1, 150), (2, 120), (2, 120), (4, 90)]
+    assert [entry["rank"] for entry in top_entries(SQUATS_BOARD)] == [1, 2, 2, 4]
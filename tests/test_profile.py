@@ -0,0 +1,30 @@
+"""Deleting a profile removes everything that belongs to the user, with foreign keys enforced."""
+from models import (db, User, Workout, WorkoutExercise, PersonalBest, DailyActivity, UserStats,
+                    WeeklyTraining, LeaderboardEntry, DerivedJob)
+
+
+def test_delete_profile_with_workouts_and_personal_bests(client, auth_headers, add_workouts):
+    assert db.session.execute(db.text("PRAGMA foreign_keys")).scalar() == 1
+    other = client.post(
+        "/register", json={"username": "runner", "email": "runner@example.com", "password": "correct horse"}
+    ).get_json()
+    client.post(
+        "/personal-bests",
+        headers={"Authorization": f"Bearer {other['access_token']}"},
+        json={"exercise_name": "Squats", "max_weight": 140},
+    )
+    add_workouts(3, exercises=2)
+    response = client.post("/personal-bests", headers=auth_headers, json={"exercise_name": "Plank", "max_duration": 90})
+    assert response.status_code == 201
+    user_id = User.query.filter_by(username="lifter").one().id
+    assert PersonalBest.query.filter_by(user_id=user_id).count() > 1
+
+    response = client.delete("/profile", headers=auth_headers)
+    assert response.status_code == 200, response.get_json()
+
+    db.session.expire_all()
+    assert db.session.get(User, user_id) is None
+    for model in (Workout, PersonalBest, DailyActivity, UserStats, WeeklyTraining, LeaderboardEntry, DerivedJob):
+        assert model.query.filter_by(user_id=user_id).count() == 0, model.__name__
+    assert WorkoutExercise.query.count() == 0
+    assert PersonalBest.query.filter_by(user_id=other["user_id"]).count() == 1
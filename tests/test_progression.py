@@ -0,0 +1,67 @@
+"""Progression series against a per-set reference computation, and its cache across writes."""
+import random
+from datetime import datetime, timedelta
+from progression import BRZYCKI_MAX_REPS, compute_progression
+
+
+def reference_progression(rows, window):
+    sessions = {}
+    for index, (workout_id, date, sets, reps, weight) in enumerate(rows):
+        sessions.setdefault(workout_id, []).append((index, date, sets, reps, weight))
+
+    series, bests = [], []
+    for workout_id, session in sessions.items():
+        def epley(row):
+            return row[4] if row[3] == 1 else row[4] * (1 + row[3] / 30)
+        # Highest estimate, then heaviest; the last such set on a full tie
+        _, _, _, reps, weight = max(session, key=lambda row: (epley(row), row[4], row[0]))
+        best = epley((None, None, None, reps, weight))
+        bests.append(best)
+        brzycki = weight * 36 / (BRZYCKI_MAX_REPS - reps) if reps < BRZYCKI_MAX_REPS else None
+        series.append({
+            "workout_id": workout_id,
+            "date": session[0][1].isoformat(),
+            "best_set": {"weight": float(weight), "reps": int(reps)},
+            "epley_1rm": round(best, 2),
+            "brzycki_1rm": None if brzycki is None else round(brzycki, 2),
+            "volume": round(sum((sets or 1) * reps * weight for _, _, sets, reps, weight in session), 2),
+            "sets": int(sum(sets or 1 for _, _, sets, _, _ in session)),
+            "best_1rm_to_date": round(max(bests), 2),
+            "rolling_best_1rm": round(max(bests[-window:]), 2),
+        })
+    return series
+
+
+def test_compute_progression_matches_reference():
+    rng = random.Random(3)
+    start = datetime(2024, 1, 1)
+    rows = []
+    for workout_id in range(1, 40):
+        for _ in range(rng.randint(1, 4)):
+            reps = rng.choice([1, 1, 3, 5, 8, 12, 36, 37, 40])
+            weight = rng.choice([60, 80, 100, 100, 102.5, 140])
+            rows.append((workout_id, start + timedelta(days=workout_id), rng.choice([None, 1, 3, 5]), reps, weight))
+
+    for window in (1, 3, 5, 100):
+        assert compute_progression(rows, window) == reference_progression(rows, window)
+
+
+def test_cached_progression_follows_writes(client, auth_headers, add_workouts):
+    workout_ids = add_workouts(4, exercises=1)
+    path = "/analytics/exercises/1/progression?window=2"
+
+    first = client.get(path, headers=auth_headers).get_json()["sessions"]
+    assert [session["workout_id"] for session in first] == workout_ids
+    assert client.get(path, headers=auth_headers).get_json()["sessions"] == first
+
+    exercise = client.get(f"/workouts/{workout_ids[0]}", headers=auth_headers).get_json()["exercises"][0]
+    client.patch(f"/workouts/{workout_ids[0]}", headers=auth_headers, json={"exercises": [
+        {"id": exercise["id"], "exercise_template_id": 1, "weight": 200, "reps": 1},
+    ]})
+    client.delete(f"/workouts/{workout_ids[-1]}", headers=auth_headers)
+
+    sessions = client.get(path, headers=auth_headers).get_json()["sessions"]
+    assert [session["workout_id"] for session in sessions] == workout_ids[:-1]
+    assert sessions[0]["best_set"] == {"weight": 200.0, "reps": 1}
+    assert [session["best_1rm_to_date"] for session in sessions] == [200.0] * 3
+    assert [session["rolling_best_1rm"] for session in sessions] == [200.0, 200.0, sessions[2]["epley_1rm"]]
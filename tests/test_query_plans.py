@@ -0,0 +1,32 @@
+"""EXPLAIN every query of the read endpoints over a small seeded database."""
+import pytest
+from sqlalchemy import text
+from models import db, User
+from query_plans import check_query_plans
+
+
+@pytest.fixture
+def seeded(client, add_workouts):
+    # A second user, so per-user reads have rows to skip
+    other = client.post(
+        "/register", json={"username": "runner", "email": "runner@example.com", "password": "correct horse"}
+    ).get_json()
+    client.post(
+        "/personal-bests",
+        headers={"Authorization": f"Bearer {other['access_token']}"},
+        json={"exercise_name": "Squats", "max_weight": 140},
+    )
+    add_workouts(6, exercises=3)
+    return User.query.filter_by(username="lifter").one().id
+
+
+def test_read_path_uses_indexes(app, seeded):
+    assert check_query_plans(app, seeded) == []
+
+
+def test_missing_index_is_reported(app, seeded):
+    db.session.execute(text("DROP INDEX ix_workouts_user_id_date_id"))
+    db.session.commit()
+
+    problems = check_query_plans(app, seeded)
+    assert any(problem.startswith("/workouts: SCAN workouts ") for problem in problems)
@@ -0,0 +1,34 @@
+"""GET handlers never write: every GET route is called and no INSERT, UPDATE or DELETE may be sent."""
+import pytest
+from conftest import recorded_statements
+from models import User
+from query_plans import WRITE_STATEMENTS, endpoint_paths
+
+
+def get_routes(app):
+    return {rule.endpoint for rule in app.url_map.iter_rules() if "GET" in rule.methods and rule.endpoint != "static"}
+
+
+@pytest.mark.parametrize("workouts", [0, 5])
+def test_get_routes_send_no_writes(app, client, auth_headers, add_workouts, workouts):
+    if workouts:
+        add_workouts(workouts, exercises=3)
+    user_id = User.query.filter_by(username="lifter").one().id
+    paths = endpoint_paths(app, user_id)
+    if workouts:
+        urls = app.url_map.bind("localhost")
+        assert {urls.match(path.split("?")[0])[0] for path in paths} == get_routes(app)
+
+    writes = []
+    for path in paths:
+        with recorded_statements() as statements:
+            response = client.get(path, headers=auth_headers)
+            # Streamed bodies run their queries as they are read
+            response.get_data()
+        assert response.status_code == 200, path
+        writes += [
+            f"{path}: {statement}" for statement in statements
+            if statement.lstrip().split(None, 1)[0].upper() in WRITE_STATEMENTS
+        ]
+
+    assert writes == []
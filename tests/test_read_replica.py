@@ -0,0 +1,79 @@
+"""Read routing with a second SQLite file as the replica."""
+import pytest
+from sqlalchemy import create_engine, insert, select
+from database import REPLICA_BIND, STICKY_COOKIE, read_your_writes
+from models import db, Workout, WeeklyTraining
+
+
+@pytest.fixture
+def replica(app, tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'replica.db'}"
+    engine = create_engine(url)
+    db.metadata.create_all(engine)
+    monkeypatch.setitem(app.config, "SQLALCHEMY_BINDS", {REPLICA_BIND: url})
+    monkeypatch.setitem(db.engines, REPLICA_BIND, engine)
+    yield engine
+    read_your_writes._recent_writers.clear()
+    engine.dispose()
+
+
+def replicate(replica):
+    """Copy every primary table to the replica, as streaming replication would have by now."""
+    with db.engine.connect() as primary, replica.begin() as copy:
+        for table in reversed(db.metadata.sorted_tables):
+            copy.execute(table.delete())
+        for table in db.metadata.sorted_tables:
+            rows = [dict(row) for row in primary.execute(select(table)).mappings()]
+            if rows:
+                copy.execute(insert(table), rows)
+
+
+def workout_names(client, auth_headers):
+    response = client.get("/workouts", headers=auth_headers)
+    assert response.status_code == 200
+    return sorted(workout["workout_name"] for workout in response.get_json())
+
+
+def forget_writes(client):
+    read_your_writes._recent_writers.clear()
+    client.delete_cookie(STICKY_COOKIE)
+
+
+def test_reads_go_to_the_replica(client, auth_headers, add_workouts, replica):
+    add_workouts(2)
+    replicate(replica)
+    forget_writes(client)
+    # Changed on the primary only, so it shows which database answered
+    Workout.query.filter_by(workout_name="Session 0").update({"workout_name": "Primary only"})
+    WeeklyTraining.query.delete()
+    db.session.commit()
+
+    assert workout_names(client, auth_headers) == ["Session 0", "Session 1"]
+    series = client.get("/analytics/timeseries", headers=auth_headers).get_json()
+    assert sum(row["workouts"] for row in series["series"]) == 2
+
+
+def test_writes_go_to_the_primary(client, auth_headers, add_workouts, replica):
+    add_workouts(1)
+    replicate(replica)
+    add_workouts(1)
+
+    with replica.connect() as connection:
+        replica_count = len(connection.execute(select(Workout.__table__.c.id)).all())
+    assert replica_count == 1
+    assert Workout.query.count() == 2
+
+
+def test_reads_stick_to_the_primary_after_a_write(client, auth_headers, add_workouts, replica):
+    add_workouts(1)
+    replicate(replica)
+    add_workouts(1)
+    assert client.get_cookie(STICKY_COOKIE) is not None
+
+    # This worker remembers the writer, and the cookie carries the deadline to the others
+    assert workout_names(client, auth_headers) == ["Session 0", "Session 0"]
+    read_your_writes._recent_writers.clear()
+    assert workout_names(client, auth_headers) == ["Session 0", "Session 0"]
+
+    forget_writes(client)
+    assert workout_names(client, auth_headers) == ["Session 0"]
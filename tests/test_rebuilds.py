@@ -0,0 +1,45 @@
+"""Full rebuilds run while a user's jobs are still queued must not count those jobs twice."""
+import pytest
+from derived_jobs import drain_jobs
+from models import db, User, DailyActivity, WeeklyTraining
+
+
+@pytest.fixture
+def queued_jobs(app, monkeypatch):
+    monkeypatch.setitem(app.config, "DERIVED_JOBS_INLINE", False)
+
+
+def add_workout(client, auth_headers, date="2024-03-05T08:00:00"):
+    response = client.post(
+        "/workouts",
+        headers=auth_headers,
+        json={"workout_name": "Run", "date": date, "workout_type_id": 2, "duration": 30},
+    )
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()["id"]
+
+
+def test_timezone_rebuild_leaves_queued_dates_to_the_worker(client, auth_headers, queued_jobs):
+    workout_id = add_workout(client, auth_headers)
+    response = client.patch("/profile", headers=auth_headers, json={"timezone": "Europe/Berlin"})
+    assert response.status_code == 200, response.get_json()
+    drain_jobs()
+    assert [row.workout_count for row in DailyActivity.query] == [1]
+
+    client.delete(f"/workouts/{workout_id}", headers=auth_headers)
+    drain_jobs()
+
+    assert DailyActivity.query.count() == 0
+    assert User.query.one().longest_streak == 0
+
+
+def test_rebuild_stats_leaves_queued_training_to_the_worker(app, client, auth_headers, queued_jobs):
+    add_workout(client, auth_headers)
+    result = app.test_cli_runner().invoke(args=["rebuild-stats"])
+    assert result.exit_code == 0, result.output
+    drain_jobs()
+
+    db.session.expire_all()
+    rows = [(row.workout_count, row.duration) for row in WeeklyTraining.query]
+    assert rows == [(1, 30)]
+    assert client.get("/progress", headers=auth_headers).get_json()["totalWorkouts"] == 1
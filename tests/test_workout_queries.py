@@ -0,0 +1,29 @@
+"""Workout responses load their exercises eagerly: the statement count does not grow with the data."""
+import pytest
+from conftest import recorded_statements
+
+
+def count_statements(client, path, headers):
+    with recorded_statements() as statements:
+        response = client.get(path, headers=headers)
+        assert response.status_code == 200, response.get_json()
+    return len(statements)
+
+
+@pytest.mark.parametrize("exercises", [1, 8])
+def test_workout_list_statement_count(client, auth_headers, add_workouts, exercises):
+    add_workouts(1, exercises)
+    one_workout = count_statements(client, "/workouts", auth_headers)
+    add_workouts(10, exercises)
+    eleven_workouts = count_statements(client, "/workouts", auth_headers)
+
+    assert one_workout == eleven_workouts == 3
+
+
+@pytest.mark.parametrize("exercises", [1, 8])
+def test_workout_detail_statement_count(client, auth_headers, add_workouts, exercises):
+    (workout_id,) = add_workouts(1, exercises)
+    response = client.get(f"/workouts/{workout_id}", headers=auth_headers)
+    assert len(response.get_json()["exercises"]) == exercises
+
+    assert count_statements(client, f"/workouts/{workout_id}", auth_headers) == 2
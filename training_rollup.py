@@ -0,0 +1,178 @@
+from collections import namedtuple
+from datetime import timedelta, timezone
+from sqlalchemy import Date, cast, func, insert, select
+from models import db, Workout, WorkoutType, WorkoutExercise, WeeklyTraining
+
+# One workout's contribution to a WeeklyTraining row
+TrainingEntry = namedtuple(
+    "TrainingEntry",
+    ["week_start", "month_start", "workout_type_id", "workout_count", "calories", "duration", "volume"],
+)
+TRAINING_FIELDS = ("workout_count", "calories", "duration", "volume")
+BUCKETS = ("week", "month")
+
+
+def week_and_month(value):
+    """UTC week (starting Monday) and month that ``value`` falls in."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    day = value.date()
+    return day - timedelta(days=day.weekday()), day.replace(day=1)
+
+
+def bucket_start(day, bucket):
+    return day - timedelta(days=day.weekday()) if bucket == "week" else day.replace(day=1)
+
+
+def sql_week_and_month():
+    # Same buckets as week_and_month(), computed by the database
+    if db.engine.dialect.name == "postgresql":
+        utc = func.timezone("UTC", Workout.date)
+        return cast(func.date_trunc("week", utc), Date), cast(func.date_trunc("month", utc), Date)
+    return (
+        func.date(Workout.date, "weekday 0", "-6 days", type_=Date),
+        func.date(Workout.date, "start of month", type_=Date),
+    )
+
+
+def _volume_by_workout(workout_filter):
+    return (
+        select(
+            WorkoutExercise.workout_id,
+            func.sum(func.coalesce(WorkoutExercise.sets, 1) * WorkoutExercise.reps * WorkoutExercise.weight)
+            .label("volume"),
+        )
+        .join(Workout, WorkoutExercise.workout_id == Workout.id)
+        .where(workout_filter)
+        .group_by(WorkoutExercise.workout_id)
+        .subquery()
+    )
+
+
+def snapshot_training(workout_ids):
+    workout_ids = list(workout_ids)
+    if not workout_ids:
+        return []
+    volume = _volume_by_workout(Workout.id.in_(workout_ids))
+    rows = db.session.execute(
+        select(
+            Workout.date,
+            Workout.workout_type_id,
+            Workout.estimated_calories,
+            Workout.duration,
+            volume.c.volume,
+        )
+        .outerjoin(volume, volume.c.workout_id == Workout.id)
+        .where(Workout.id.in_(workout_ids))
+    )
+    return [
+        TrainingEntry(*week_and_month(date), workout_type_id, 1, calories or 0, duration or 0, workout_volume or 0)
+        for date, workout_type_id, calories, duration, workout_volume in rows
+        if date is not None
+    ]
+
+
+def apply_training(user_id, added=(), removed=()):
+    """Fold a write's before/after TrainingEntry snapshots into the user's weekly rows."""
+    deltas = {}
+    for sign, entries in ((1, added), (-1, removed)):
+        for entry in entries:
+            key = (entry.week_start, entry.month_start, entry.workout_type_id)
+            delta = deltas.setdefault(key, [0, 0, 0, 0])
+            for i, field in enumerate(TRAINING_FIELDS):
+                delta[i] += sign * getattr(entry, field)
+    deltas = {key: delta for key, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+
+    existing = {
+        (row.week_start, row.month_start, row.workout_type_id): row
+        for row in WeeklyTraining.query.filter(
+            WeeklyTraining.user_id == user_id,
+            WeeklyTraining.week_start.in_({key[0] for key in deltas}),
+        )
+    }
+    for key, delta in deltas.items():
+        row = existing.get(key)
+        values = [(getattr(row, field) or 0) if row else 0 for field in TRAINING_FIELDS]
+        values = [value + change for value, change in zip(values, delta)]
+        if values[0] <= 0:
+            if row is not None:
+                db.session.delete(row)
+            continue
+        if row is None:
+            week_start, month_start, workout_type_id = key
+            row = WeeklyTraining(
+                user_id=user_id, week_start=week_start, month_start=month_start, workout_type_id=workout_type_id
+            )
+            db.session.add(row)
+        for field, value in zip(TRAINING_FIELDS, values):
+            setattr(row, field, value)
+
+
+def rebuild_training(user_id, queued_added=(), queued_removed=()):
+    """Recompute the user's weekly rows from the workout history with SQL date bucketing.
+
+    Entries still queued for the worker are left out, as in rebuild_user_stats().
+    """
+    WeeklyTraining.query.filter_by(user_id=user_id).delete()
+    week_start, month_start = sql_week_and_month()
+    volume = _volume_by_workout(Workout.user_id == user_id)
+    rows = db.session.execute(
+        select(
+            week_start.label("week_start"),
+            month_start.label("month_start"),
+            Workout.workout_type_id,
+            func.count(Workout.id).label("workout_count"),
+            func.coalesce(func.sum(Workout.estimated_calories), 0).label("calories"),
+            func.coalesce(func.sum(Workout.duration), 0).label("duration"),
+            func.coalesce(func.sum(volume.c.volume), 0).label("volume"),
+        )
+        .outerjoin(volume, volume.c.workout_id == Workout.id)
+        .where(Workout.user_id == user_id, Workout.date.isnot(None))
+        .group_by(week_start, month_start, Workout.workout_type_id)
+    ).mappings().all()
+    if rows:
+        db.session.execute(insert(WeeklyTraining), [dict(row, user_id=user_id) for row in rows])
+    if queued_added or queued_removed:
+        db.session.flush()
+        apply_training(user_id, added=queued_removed, removed=queued_added)
+
+
+def training_series(user_id, bucket="week", start=None, end=None, workout_type_id=None):
+    """Per-bucket, per-workout-type totals between the dates ``start`` and ``end``, from the rollup."""
+    period = WeeklyTraining.week_start if bucket == "week" else WeeklyTraining.month_start
+    query = (
+        select(
+            period.label("period_start"),
+            WeeklyTraining.workout_type_id,
+            WorkoutType.name,
+            func.sum(WeeklyTraining.workout_count),
+            func.sum(WeeklyTraining.calories),
+            func.sum(WeeklyTraining.duration),
+            func.sum(WeeklyTraining.volume),
+        )
+        .join(WorkoutType, WeeklyTraining.workout_type_id == WorkoutType.id)
+        .where(WeeklyTraining.user_id == user_id)
+        .group_by(period, WeeklyTraining.workout_type_id, WorkoutType.name)
+        .order_by(period, WeeklyTraining.workout_type_id)
+    )
+    if start is not None:
+        query = query.where(period >= bucket_start(start, bucket))
+    if end is not None:
+        query = query.where(period <= end)
+    if workout_type_id is not None:
+        query = query.where(WeeklyTraining.workout_type_id == workout_type_id)
+
+    return [
+        {
+            "period_start": period_start.isoformat(),
+            "workout_type_id": type_id,
+            "workout_type_name": type_name,
+            "workouts": count,
+            "calories": round(calories, 2),
+            "duration": duration,
+            "volume": round(volume, 2),
+        }
+        for period_start, type_id, type_name, count, calories, duration, volume in db.session.execute(query)
+    ]
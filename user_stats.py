@@ -0,0 +1,85 @@
+from collections import namedtuple
+from sqlalchemy import func, select
+from models import db, Workout, WorkoutExercise, UserStats
+
+# Field names match the UserStats columns they feed
+WorkoutTotals = namedtuple(
+    "WorkoutTotals",
+    ["total_workouts", "total_exercises", "total_calories", "total_duration", "total_distance"],
+)
+NO_TOTALS = WorkoutTotals(0, 0, 0, 0, 0)
+
+
+def _totals(workout_filter, exercise_filter):
+    workouts = db.session.execute(
+        select(
+            func.count(Workout.id),
+            func.coalesce(func.sum(Workout.estimated_calories), 0),
+            func.coalesce(func.sum(Workout.duration), 0),
+        ).where(workout_filter)
+    ).one()
+    exercises = db.session.execute(
+        select(
+            func.count(WorkoutExercise.id),
+            func.coalesce(func.sum(WorkoutExercise.distance), 0),
+        )
+        .join(Workout, WorkoutExercise.workout_id == Workout.id)
+        .where(exercise_filter)
+    ).one()
+    return WorkoutTotals(
+        total_workouts=workouts[0],
+        total_exercises=exercises[0],
+        total_calories=workouts[1],
+        total_duration=workouts[2],
+        total_distance=exercises[1],
+    )
+
+
+def snapshot_workout_totals(workout_ids):
+    workout_ids = list(workout_ids)
+    if not workout_ids:
+        return NO_TOTALS
+    return _totals(Workout.id.in_(workout_ids), WorkoutExercise.workout_id.in_(workout_ids))
+
+
+def compute_user_stats(user_id):
+    """Aggregate the user's whole history in SQL; the fallback when no rollup row exists."""
+    totals = _totals(Workout.user_id == user_id, Workout.user_id == user_id)
+    return UserStats(user_id=user_id, **totals._asdict())
+
+
+def get_user_stats(user_id):
+    return db.session.get(UserStats, user_id) or compute_user_stats(user_id)
+
+
+def apply_user_stats(user_id, added=NO_TOTALS, removed=NO_TOTALS, queued=NO_TOTALS):
+    """Fold a write's before/after workout totals into the user's rollup row.
+
+    Without a row the totals are rebuilt from the workout tables instead;
+    see rebuild_user_stats() for ``queued``.
+    """
+    stats = db.session.get(UserStats, user_id)
+    if stats is None:
+        rebuild_user_stats(user_id, queued)
+        return
+
+    for field in WorkoutTotals._fields:
+        value = getattr(stats, field) or 0
+        setattr(stats, field, value + getattr(added, field) - getattr(removed, field))
+
+
+def rebuild_user_stats(user_id, queued=NO_TOTALS):
+    """Recompute the user's row from the workout tables.
+
+    The tables already hold writes whose deltas are still queued for the
+    worker; ``queued`` is their sum, left out here so applying them later
+    doesn't count them twice.
+    """
+    stats = db.session.get(UserStats, user_id)
+    if stats is not None:
+        db.session.delete(stats)
+    db.session.flush()
+    stats = compute_user_stats(user_id)
+    for field in WorkoutTotals._fields:
+        setattr(stats, field, getattr(stats, field) - getattr(queued, field))
+    db.session.add(stats)
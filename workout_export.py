@@ -0,0 +1,32 @@
+import json
+import zlib
+from models import db, Workout
+from serializers import workout_select, workout_dicts
+
+EXPORT_CHUNK_SIZE = 500
+
+
+def iter_workout_ndjson(user_id, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the user's workouts as NDJSON, one encoded chunk per cursor partition.
+
+    Workouts come from a server-side cursor (yield_per), and each partition's
+    exercises are fetched with one IN query, so memory is bounded by the
+    chunk size rather than the history length.
+    """
+    result = db.session.execute(
+        workout_select()
+        .where(Workout.user_id == user_id)
+        .order_by(Workout.date, Workout.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    for workouts in result.partitions():
+        yield "".join(json.dumps(workout) + "\n" for workout in workout_dicts(workouts)).encode("utf-8")
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip header
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
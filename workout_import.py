@@ -0,0 +1,245 @@
+"""Bulk import of workout history exported from other apps.
+
+CSV input has one row per exercise; consecutive rows with the same date and
+workout_name make up one workout:
+
+    date,workout_name,workout_type,notes,intensity,duration,exercise,sets,reps,weight,exercise_duration,distance
+
+NDJSON input has one workout per line, in the shape of POST /workouts (or of
+GET /workouts/export). Workout types and exercises may be given by id or by
+name; names are resolved against the catalog cache.
+"""
+import csv
+import io
+import json
+from sqlalchemy import func, insert, text
+from models import db, User, Workout, WorkoutExercise, ExerciseTemplate
+from catalog import catalog
+from derived_jobs import drain_jobs, queued_changes
+from personal_bests import recompute_personal_bests
+from leaderboards import update_leaderboards
+from streaks import rebuild_user_streaks
+from user_stats import rebuild_user_stats
+from training_rollup import rebuild_training
+
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_ERRORS = 100
+
+WORKOUT_CSV_FIELDS = ('workout_name', 'workout_type', 'notes', 'intensity', 'duration')
+EXERCISE_CSV_FIELDS = (('sets', 'sets'), ('reps', 'reps'), ('weight', 'weight'),
+                       ('exercise_duration', 'duration'), ('distance', 'distance'))
+
+
+def _blank_to_none(value):
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    return value
+
+
+def read_csv_records(stream):
+    """Yield (line, record) pairs, grouping consecutive rows of the same workout."""
+    reader = csv.DictReader(stream)
+    current, current_key, start_line = None, None, None
+    for row in reader:
+        row = {key.strip(): _blank_to_none(value) for key, value in row.items() if key}
+        key = (row.get('date'), row.get('workout_name'))
+        if current is None or key != current_key:
+            if current is not None:
+                yield start_line, current
+            current = {field: row.get(field) for field in WORKOUT_CSV_FIELDS}
+            current['date'] = row.get('date')
+            current['exercises'] = []
+            current_key, start_line = key, reader.line_num
+        if row.get('exercise'):
+            exercise = {'name': row['exercise']}
+            for column, field in EXERCISE_CSV_FIELDS:
+                exercise[field] = row.get(column)
+            current['exercises'].append(exercise)
+    if current is not None:
+        yield start_line, current
+
+
+def read_ndjson_records(stream):
+    """Yield (line, record) pairs; a line that is not valid JSON yields the error instead."""
+    for line_no, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError as e:
+            yield line_no, ValueError(f"Invalid JSON: {e}")
+
+
+READERS = {'csv': read_csv_records, 'ndjson': read_ndjson_records}
+
+
+def resolve_names(record):
+    """Return ``record`` in POST /workouts form, with names replaced by catalog ids."""
+    if not isinstance(record, dict):
+        raise ValueError("Each workout must be an object")
+
+    type_name = record.get('workout_type') or record.get('workout_type_name')
+    if type_name:
+        workout_type = catalog.find_workout_type(type_name)
+        if workout_type is None:
+            raise ValueError(f"Unknown workout type '{type_name}'")
+    else:
+        workout_type = catalog.get_workout_type(record.get('workout_type_id'))
+        if workout_type is None:
+            raise ValueError(f"Workout type {record.get('workout_type_id')} not found")
+
+    exercises = []
+    for exercise in record.get('exercises') or []:
+        name = exercise.get('name') or exercise.get('exercise')
+        if name:
+            template = catalog.find_template(name, workout_type.id)
+            if template is None:
+                raise ValueError(f"Unknown exercise '{name}'")
+            exercise = dict(exercise, exercise_template_id=template.id)
+        exercises.append(exercise)
+
+    return dict(record, workout_type_id=workout_type.id, exercises=exercises)
+
+
+def _allocate_ids(table, count, after):
+    """Reserve ``count`` primary keys for ``table`` so child rows can be written without RETURNING."""
+    if db.engine.dialect.name == 'postgresql':
+        return db.session.scalars(
+            text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :count)"),
+            {"table": table.name, "count": count}
+        ).all()
+    # Elsewhere the import holds the database write lock, so max(id) cannot move under it
+    if after is None:
+        after = db.session.query(func.max(table.c.id)).scalar() or 0
+    return list(range(after + 1, after + count + 1))
+
+
+def _copy_rows(table, rows):
+    columns = [c.key for c in table.columns]
+    buffer = io.StringIO()
+    # QUOTE_NONNUMERIC leaves None unquoted, which COPY reads as NULL
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+    for row in rows:
+        writer.writerow([row.get(column) for column in columns])
+    buffer.seek(0)
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+
+def _write_rows(table, rows):
+    if not rows:
+        return
+    if db.engine.dialect.name == 'postgresql':
+        _copy_rows(table, rows)
+    else:
+        db.session.execute(insert(table), rows)
+
+
+class WorkoutImporter:
+    """Streams parsed records into the database in batches of ``batch_size`` workouts.
+
+    ``build`` validates one POST /workouts style item and returns
+    (workout_row, exercise_rows), as for POST /workouts/bulk. Everything runs
+    in one transaction; PBs, streaks, stats and the weekly rollup are
+    rebuilt once at the end.
+    """
+
+    def __init__(self, user_id, build, batch_size=IMPORT_BATCH_SIZE):
+        self.user_id = user_id
+        self.build = build
+        self.batch_size = batch_size
+        self.imported = 0
+        self.exercises = 0
+        self.failed = 0
+        self.errors = []
+        self._batch = []
+        self._template_ids = set()
+        self._last_workout_id = None
+        self._last_exercise_id = None
+
+    def summary(self):
+        return {"imported": self.imported, "exercises": self.exercises, "failed": self.failed}
+
+    def _reject(self, line, error):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"line": line, "error": str(error)})
+
+    def _flush(self):
+        if not self._batch:
+            return
+        workout_table, exercise_table = Workout.__table__, WorkoutExercise.__table__
+
+        workout_ids = _allocate_ids(workout_table, len(self._batch), self._last_workout_id)
+        workout_rows, exercise_rows = [], []
+        for workout_id, (workout_row, rows) in zip(workout_ids, self._batch):
+            workout_rows.append(dict(workout_row, id=workout_id))
+            exercise_rows.extend(dict(row, workout_id=workout_id) for row in rows)
+        if exercise_rows:
+            exercise_ids = _allocate_ids(exercise_table, len(exercise_rows), self._last_exercise_id)
+            for row, exercise_id in zip(exercise_rows, exercise_ids):
+                row['id'] = exercise_id
+            self._last_exercise_id = exercise_ids[-1]
+        self._last_workout_id = workout_ids[-1]
+
+        _write_rows(workout_table, workout_rows)
+        _write_rows(exercise_table, exercise_rows)
+
+        self.imported += len(workout_rows)
+        self.exercises += len(exercise_rows)
+        self._batch = []
+
+    def _finish(self):
+        user = db.session.get(User, self.user_id)
+        queued = queued_changes(self.user_id)
+        rebuild_user_streaks(user, queued.dates_added, queued.dates_removed)
+        rebuild_user_stats(self.user_id, queued.totals)
+        rebuild_training(self.user_id, queued.training_added, queued.training_removed)
+        names = []
+        if self._template_ids:
+            names = [
+                name for (name,) in db.session.query(ExerciseTemplate.name)
+                .filter(ExerciseTemplate.id.in_(self._template_ids)).distinct()
+            ]
+            recompute_personal_bests(self.user_id, names)
+        update_leaderboards(self.user_id, names)
+
+    def run(self, records):
+        """Import ``records`` ((line, record) pairs), yielding progress after every batch.
+
+        The last item yielded is the final summary, with ``done`` set. Commits
+        on success and rolls back on error.
+        """
+        # Settle queued updates first: the rebuild at the end replaces their deltas
+        drain_jobs(self.user_id)
+        try:
+            # Locks the user (and on SQLite the database) until the import commits
+            User.query.filter_by(id=self.user_id).with_for_update().first()
+            User.bump_data_version(self.user_id)
+
+            for line, record in records:
+                if isinstance(record, Exception):
+                    self._reject(line, record)
+                    continue
+                try:
+                    workout_row, exercise_rows = self.build(self.user_id, resolve_names(record))
+                except (ValueError, TypeError, AttributeError) as e:
+                    self._reject(line, e)
+                    continue
+                self._template_ids.update(row['exercise_template_id'] for row in exercise_rows)
+                self._batch.append((workout_row, exercise_rows))
+                if len(self._batch) >= self.batch_size:
+                    self._flush()
+                    yield self.summary()
+            self._flush()
+
+            if self.imported:
+                self._finish()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        yield dict(self.summary(), errors=self.errors, done=True)